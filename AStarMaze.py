@@ -1,116 +1,73 @@
 from maze_generator import maze_generator
-from queue import PriorityQueue
+from weighted_grid import WeightedGrid
+from astar_solver import a_star_search
+from maze_render import ppm_image, PATH, EXPLORED
+from math import ceil
 import tkinter as tk
-import time
-from math import sqrt
-
-class WeightedGrid:   
-    def __init__(self, width, height):
-        """
-            creates a WeightedGrid object
-            
-            pre: int width and height are passed in
-            post: an empty grid with a empty list of obstructions and an
-                 empty dict of (location,weights) k,v pairs is created
-        """
-        self.width = width
-        self.height = height
-        self.obstructions = []
-        self.weights = {}
-        print("total map area is ",width*height)
-
-    def on_grid(self,location):
-        """
-            pre: location (x,y) is passed in
-            post: if it is within bounds of the grid, returns True, else False
-        """
-        return 0 <= location[0] < self.width and 0 <= location[1] < self.height
-
-    def traversable(self,location):
-        """
-            pre: location (x,y) is passed in
-            post: if the location is in the list of obstructions, returns False
-                  otherwise returns True
-        """
-        if location in self.obstructions: return False
-        else: return True
-        
-    def neighbors(self,p):
-        """
-            pre: a location is passed in
-            post: returns a list of valid_moves.  valid_moves are
-                    1) on the grid, and
-                    2) traversable
-        """     
-        x,y = p[0],p[1]
-        neighbors = [(x+1, y), (x-1, y), (x, y-1), (x, y+1)] # E W N S
-        # There is an explanation for this next snippet in the "Ugly Path" section
-        # from the article I used as a source.
-        if (x + y) % 2 == 0: neighbors.reverse() # S N W E       
-        valid_moves = filter(self.on_grid, neighbors)
-        valid_moves = filter(self.traversable, valid_moves)
-        return valid_moves
-
-    
-    def cost(self, A, B):
-        """
-            pre: A is current location, B is destination location.
-            post: returns weight value of B if the location's weight has been calculated,
-                    or 1 otherwise.
-        """
-        return self.weights.get(B, 1)
-
-
-def heuristic(p, goal):
-    """
-        manhattan heuristic
-        pre: 'p' and 'goal' are (x,y) coordinates
-        post: returns the calculated distance between the points.
-    """   
-    return sqrt((p[0] - goal[0])**2 +(p[1] - goal[1])**2)
-
 
 class AStarMaze(tk.Frame):
     """
         Tkinter driver
     """
-    def __init__(self,width,height):
+    # frames per second used when animating the path
+    FPS = 60
+
+    def __init__(self,width,height,animate=False,duration=2.0,seed=None,show_search=False):
+        """
+            pre: width and height of the maze.  If animate is True the path is
+                 drawn out over about duration seconds, a few steps per frame.
+                 seed picks the maze (see maze_generator).  If show_search is
+                 True the locations A* expanded are drawn too, in the order it
+                 expanded them when animating, recorded by an on_expand hook.
+        """
         super().__init__()
         self.master.title("AStar")
         self.width = width
         self.height = height
+        self.animate = animate
+        self.duration = duration
+        self._images = None
+        self._images_for = None
+        self.explored = []
+        self._frame_job = None
+        self._resize_job = None
         self._screen()        
         self.grid(row=0,
                   column=0,
                   sticky=tk.N+tk.S+tk.E+tk.W)
 
-        self.mg = maze_generator()
-        self.mg.new_grid(width,height)
-        self.mg.make_maze()   
+        self.mg = maze_generator(width,height,seed=seed)
 
         # create a WeightedGrid to use with the A* search
-        self.wgrid = WeightedGrid(self.width,self.height)
-
         """#<-- Adjust comments to alternate between behaviors
         # use this block of code to see the cool maze example
         fip = open('cool_maze.txt', 'r')
         lines = [line.strip() for line in fip]
-        self.wgrid.obstructions = self.walls_from_maze(lines)
+        self.wgrid = WeightedGrid.from_maze(lines, self.width, self.height)
         self.start =  (11,1)
         self.goal = (39,39)
         # """
      
         #<-- use this block of code to generate random mazes
-        self.wgrid.obstructions = self.walls_from_maze(self.mg.display())
+        self.wgrid = WeightedGrid.from_maze(self.mg.display(), self.width, self.height)
         self.start = self.mg.start
         self.goal = self.mg.goal
+        print("total map area is ",self.width*self.height)
         print("start is",self.start)
         print("goal is", self.goal)
          
         
-        self.path_from = self.a_star_search(self.wgrid,
-                                            self.start,
-                                            self.goal)
+        if show_search:
+            self.result = a_star_search(self.wgrid, self.start, self.goal,
+                                        on_expand=lambda p, cost: self.explored.append(p))
+        else:
+            self.result = a_star_search(self.wgrid, self.start, self.goal)
+        self.path = self.result.path
+        if self.path is None:
+            print("the goal can not be reached")
+            self.path = []
+        else:
+            print(f'steps to goal: {len(self.path)}')
         
         
         # Configurations to make window resizable
@@ -119,9 +76,7 @@ class AStarMaze(tk.Frame):
         self.top.columnconfigure(0, weight=1)
         self.columnconfigure(0,minsize=960, weight=1)
         self.rowconfigure(0,minsize=640, weight=1)
-        self._draw_weighted_grid(self.wgrid,self.retrace_steps(self.path_from,
-                                                           start=self.start,
-                                                           goal=self.goal))
+        self._draw_weighted_grid(self.wgrid,self.path,self.animate)
         self.gfx.bind('<Configure>', self.__redraw)
 
 
@@ -140,53 +95,112 @@ class AStarMaze(tk.Frame):
                       sticky=tk.N+tk.S+tk.E+tk.W)
 
 
-    def _draw_weighted_grid(self, g, path):
+    def _draw_weighted_grid(self, g, path, animate=False):
         """
             _draw_weighted_grid is used to draw the maze onto the canvas
+
+            The maze is rasterized into a PhotoImage once, with one pixel per
+            location, and scaled by a whole number to fit the canvas (zoomed in,
+            or subsampled for mazes larger than the canvas).  The path is a
+            single polyline through the centers of its locations.  Everything on
+            the canvas is deleted first, so redrawing never stacks up items.
         """
         self.update_idletasks()
+        # when animating, the explored locations are painted in frame by frame
+        painted = 0 if animate else len(self.explored)
+        if self._images is None or self._images_for != (g, painted):
+            data = ppm_image(g, self.start, self.goal, self.explored[:painted])
+            self._images = {1: tk.PhotoImage(data=data, format='PPM')}
+            self._images_for = (g, painted)
+
+        # whole number scale factor that fits the canvas
+        cw, ch = max(1, self.gfx.winfo_width()), max(1, self.gfx.winfo_height())
+        zoom = min(cw // g.width, ch // g.height)
+        if zoom >= 1:
+            key, size = zoom, zoom
+        else:
+            sub = ceil(max(g.width/cw, g.height/ch))
+            key, size = -sub, 1/sub
+        image = self._images.get(key)
+        if image is None:
+            base = self._images[1]
+            image = base.zoom(key) if key > 0 else base.subsample(-key)
+            self._images[key] = image
+
+        self.gfx.delete('all')
+        self.gfx.create_image(0, 0, image=image, anchor=tk.NW)
+        self._image, self._size = image, size
+
+        self._path_coords = [c for p in path for c in ((p[0]+0.5)*size, (p[1]+0.5)*size)]
+        self._path_line = None
+        if animate:
+            # reveal enough per frame to finish each part in about self.duration
+            self._shown = 0
+            self._per_frame = max(1, int(len(path) / (self.duration*self.FPS)))
+            self._painted = 0
+            self._explored_per_frame = max(1, int(len(self.explored) / (self.duration*self.FPS)))
+            self._animate_search()
+        else:
+            self._draw_path(len(path))
+
+    def _draw_path(self, shown):
+        """
+            _draw_path() draws the first shown locations of the path as a
+            single line, creating the line the first time.
+        """
+        if len(self._path_coords) < 4: return
+        coords = self._path_coords[:2*max(2, shown)]
+        if self._path_line is None:
+            self._path_line = self.gfx.create_line(*coords,
+                                                   fill='#%02x%02x%02x' % PATH,
+                                                   width=max(1, int(self._size*0.6)),
+                                                   capstyle=tk.ROUND,
+                                                   joinstyle=tk.ROUND)
+        else:
+            self.gfx.coords(self._path_line, *coords)
+
+    def _animate_search(self):
+        """
+            _animate_search() paints the next few explored locations onto the
+            maze image, and once all are shown starts drawing out the path.
+        """
+        color = '#%02x%02x%02x' % EXPLORED
+        base, image, size = self._images[1], self._image, self._size
+        batch = self.explored[self._painted:self._painted + self._explored_per_frame]
+        for x, y in batch:
+            if (x, y) == self.start or (x, y) == self.goal: continue
+            base.put(color, to=(x, y, x+1, y+1))
+            if image is not base:
+                x0, y0 = int(x*size), int(y*size)
+                image.put(color, to=(x0, y0, max(x0+1, int((x+1)*size)),
+                                     max(y0+1, int((y+1)*size))))
+        self._painted += len(batch)
+        if self._painted < len(self.explored):
+            self._frame_job = self.after(1000 // self.FPS, self._animate_search)
+        else:
+            self._animate_path()
+
+    def _animate_path(self):
+        """
+            _animate_path() extends the path line by a few points and schedules
+            itself for the next frame until the whole path is shown.
+        """
+        self._shown = min(len(self._path_coords)//2, self._shown + self._per_frame)
+        self._draw_path(self._shown)
+        if self._shown < len(self._path_coords)//2:
+            self._frame_job = self.after(1000 // self.FPS, self._animate_path)
+        else:
+            self._frame_job = None
 
-        # used to calculate the size of a location for drawing.
-        x = int(self.top.winfo_width())/self.width
-        y = int(self.top.winfo_height())/self.height
-        locX,locY = 0,0
-
-        """ draws all the walls """
-        for i in range(self.height):
-            for n in range(self.width):
-                if (n,i) in g.obstructions:
-                    self.gfx.create_rectangle(locX,locY,locX+x,locY+y,fill="#ddd",stipple='gray75',outline="gray")
-                elif (n,i) == self.start:
-                    self.gfx.create_rectangle(locX,locY,locX+x,locY+y,fill="#f00")
-                elif (n,i) == self.goal:
-                    self.gfx.create_rectangle(locX,locY,locX+x,locY+y,fill="#00f")
-                else: pass
-                self.gfx.update()
-                locX += x
-            locX = 0
-            locY += y
-        locY = 0
-
-        """ then draws the path found by the A*"""
-        for i in path:
-            if not i in [self.start, self.goal]:
-                locX += x*i[0]
-                locY += y*i[1]
-                self.gfx.create_rectangle(locX,locY,locX+x,locY+y,fill="#99ff44",outline="black")
-                self.gfx.update()
-                time.sleep(0.01)
-                locX = 0
-                locY = 0
-                 
     def __redraw(self, event):
         """ __redraw() is an event handler for events fired
-                by configuring (resizing) the window
+                by configuring (resizing) the window.  Resizes come in
+                bursts, so the redraw waits until they settle.
         """
-        
-        self.gfx.create_rectangle(0, 0, int(self.gfx.winfo_width()), int(self.top.winfo_height()), fill="#111", outline="#eee")     
-        self._draw_weighted_grid(self.wgrid,self.retrace_steps(self.path_from,
-                                                                   start=self.start,
-                                                                 goal=self.goal))
+        for job in (self._frame_job, self._resize_job):
+            if job is not None: self.after_cancel(job)
+        self._frame_job = None
+        self._resize_job = self.after(50, self._draw_weighted_grid, self.wgrid, self.path)
 
     def walls_from_maze(self, display):
         """
@@ -205,86 +219,10 @@ class AStarMaze(tk.Frame):
             loc[0] += 1
         return walls
 
-    def retrace_steps(self, path_from, start, goal):
-        """
-        pre: path_from is the path taken to get from start to goal,
-             start and goal are (x,y) tuple coordinates.
-        post: path_from is traced back to the start, and each location is appended to the
-                path[] list. The list is reversed to reflect the actual order of the path.
-                finally path is returned.
-        """
-        at = goal
-        path = []
-        while at != start:
-            path.append(at)
-            at = path_from[at]
-        path.append(start)
-        path.reverse()
-        print(f'steps to goal: {len(path)}')
-        return path
-            
-    def a_star_search(self, graph, start, goal):
-        """
-            A* search used with a weighted_grid to
-               find shortest path from start to goal.
-                        
-            pre: graph is th weighted_grid, start and goal are (x,y) coordinates
-            post: finds shortest path using manhattan distance heuristic
-            
-        """
-
-        # create a priority queue for the frontier and add the start
-        frontier = PriorityQueue()
-        frontier.put(start, 0)
-
-        # an empty dictionary to store the path from start to current locations along the way.
-        path_from = {}
-
-        # an empty dictionary to store the cost of moving to a location from start.
-        accumulated_cost = {}
-        # the accumulated_cost of being at the start point is 0
-        accumulated_cost[start] = 0
-        # start has no parent location
-        path_from[start] = None
-
-        # while exploring.
-        while not frontier.empty():
-
-            # get the priority
-            at = frontier.get()
-
-            # if we are at the goal, break out.
-            if at == goal: break
-
-            # otherwise... for available neighboring destinations 'to' from 'at', do the following.
-            for to in graph.neighbors(at):
-
-                # new cost is the sum of the accumulated cost of the current 'at' location and the
-                # cost of the next location 'to'.  'to' has either been explored already and has a weight,
-                # or it is unexplored and the added cost to move is accumulated_cost[at] + 1
-                new_cost = accumulated_cost[at] + graph.cost(at,to)
-
-                # if destination 'to' not in the dictionary of locations that have had their
-                # costs from start calculated, or the new_cost of reaching the location 'to'
-                # is less than the previously recorded cost of reaching 'to',
-                # then set the new_cost, and place 'to' back into the priority queue with
-                # a newly calculated priority.
-                if to not in accumulated_cost or new_cost < accumulated_cost[to]:
-                    accumulated_cost[to] = new_cost
-
-                    # priority is calculated by adding the new cost of reaching location 'to'
-                    # plus the calculated manhattan distance of goal from that location.
-                    priority = new_cost + heuristic(to, goal)
-                    frontier.put(to, priority)
-
-                    # the move is recorded in the path_from dictionary
-                    path_from[to] = at
-
-        return path_from
-
 
 if __name__ == '__main__':
-    app = AStarMaze(80,40)
+    app = AStarMaze(80,40,animate=True,show_search=True)
+    app.mainloop()
     # The only way out is in...
 
     
@@ -0,0 +1,668 @@
+"""
+    Standalone A* solver for WeightedGrid mazes.
+
+    Nothing in here imports tkinter, so the solver can be used from scripts,
+    worker processes and servers as well as from the AStarMaze driver.
+
+    Locations are handled as integer indexes into the grid (index = y*width + x)
+    while searching.  Accumulated costs and parents live in flat arrays the size
+    of the grid instead of dicts keyed by (x,y) tuples, the frontier is a plain
+    heapq of (priority, -cost, tiebreak, index) entries, and a closed set of already
+    expanded locations lets stale heap entries be skipped when they are popped
+    (lazy deletion) instead of searched for and removed.
+
+    Parents are stored as one byte per location, the code of the move that
+    reached it (an index into _ORDER), rather than the parent's index.  With
+    the costs (8 bytes) and the closed flags (1 byte) a search needs 10 bytes
+    per location of the grid.  Two bits would be enough for the move, but
+    packing four to a byte costs shifts and masks on every access.  The path
+    is handed back as a CompactPath, the start and the runs of moves, and is
+    only turned into a list of (x,y) tuples if SearchResult.path is read.
+
+    Neighbors are looked up in the grid's neighbor masks (see
+    WeightedGrid.masks), one byte per location giving its possible moves and
+    the parity of its tie-break, so no bounds or walls are tested while
+    expanding.
+
+    The heuristic is picked per search, by name from the heuristics registry
+    or as a factory of its own, see heuristics.py.
+
+    Searches can be instrumented by passing a SearchStats and/or on_expand and
+    on_relax callbacks.  Instrumented searches run a separate copy of the
+    search loop, so a search without them pays nothing for the feature.
+
+    Besides plain A* there are two search modes, picked with mode=:
+
+        bidirectional  A* from the start and from the goal at once, both
+                       sides guided by one averaged potential so the search
+                       can stop as soon as their frontiers together can no
+                       longer beat the best meeting point found.
+        jps            Jump point search for 4-connected grids.  Runs of
+                       locations with no open neighbor to either side of the
+                       direction of travel are jumped over in one step, so
+                       long corridors cost one expansion instead of one per
+                       location.  It needs uniform costs, on weighted grids
+                       it falls back to plain A*.
+
+    Every mode returns a path of the same cost as plain A*, although when
+    several paths tie it may be a different one.
+"""
+import heapq
+from array import array
+from math import inf
+from time import perf_counter
+from heuristics import get_heuristic, reverse_heuristic
+from weighted_grid import MOVES, MOVE_TABLE
+
+# neighbor order used by WeightedGrid.neighbors(), E W N S, and the reversed
+# S N W E order used on locations where (x + y) is even.
+_ORDER = MOVES
+_REVERSED_ORDER = _ORDER[::-1]
+
+# the code of a move is its index in _ORDER.  The opposite of move d is d ^ 1.
+
+# parent code of locations not reached yet, and of the start.
+_NO_MOVE = 255
+
+SEARCH_MODES = ('astar', 'bidirectional', 'jps')
+
+
+def _index_moves(w):
+    """
+        post: returns MOVE_TABLE with every move as (index offset, code) on a
+              grid of width w.
+    """
+    return [tuple((dy*w + dx, d) for dx, dy, d in moves) for moves in MOVE_TABLE]
+
+
+class CompactPath:
+    """
+        A path stored as its start and the runs of moves along it.
+
+        moves is a bytearray of (code, count) byte pairs, code being an index
+        into _ORDER and count (1 to 255) how many times the move is repeated;
+        longer runs take several pairs.  A path of n locations with r turns
+        takes about 2*r bytes however long it is.  Iterating yields the (x,y)
+        locations from the start without building a list.
+    """
+    def __init__(self, start, moves=b''):
+        self.start = tuple(start)
+        self.moves = bytearray(moves)
+        self._length = 1 + sum(self.moves[1::2])
+
+    @classmethod
+    def from_runs(cls, start, runs):
+        """
+            pre: runs is an iterable of (code, count) pairs
+            post: returns the CompactPath making those moves from start
+        """
+        path = cls(start)
+        for code, count in runs: path.extend(code, count)
+        return path
+
+    @classmethod
+    def from_path(cls, path):
+        """
+            pre: path is a list of (x,y) locations, each next to the one before
+            post: returns the CompactPath of path
+        """
+        compact = cls(path[0])
+        x0, y0 = path[0]
+        for x, y in path[1:]:
+            compact.extend(_ORDER.index((x - x0, y - y0)), 1)
+            x0, y0 = x, y
+        return compact
+
+    def extend(self, code, count):
+        """
+            post: count moves of code are added to the end of the path
+        """
+        moves = self.moves
+        self._length += count
+        if moves and moves[-2] == code and moves[-1] < 255:
+            room = min(255 - moves[-1], count)
+            moves[-1] += room
+            count -= room
+        while count > 0:
+            moves += bytes((code, min(count, 255)))
+            count -= 255
+
+    def runs(self):
+        """
+            post: yields ((dx,dy), count) for every run of moves
+        """
+        moves = self.moves
+        for i in range(0, len(moves), 2):
+            yield _ORDER[moves[i]], moves[i+1]
+
+    def __iter__(self):
+        x, y = self.start
+        yield (x, y)
+        for (dx, dy), count in self.runs():
+            for _ in range(count):
+                x += dx
+                y += dy
+                yield (x, y)
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def end(self):
+        """
+            post: returns the last (x,y) location of the path
+        """
+        x, y = self.start
+        for (dx, dy), count in self.runs():
+            x += dx*count
+            y += dy*count
+        return (x, y)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactPath): return NotImplemented
+        return self.start == other.start and self.moves == other.moves
+
+    def __repr__(self):
+        return f'CompactPath(start={self.start}, steps={len(self)}, runs={len(self.moves)//2})'
+
+
+class SearchResult:
+    """
+        The outcome of a single search.
+
+        path      list of (x,y) locations from start to goal, or None when the
+                  goal can not be reached.  Built from compact the first time
+                  it is read.
+        compact   the path as a CompactPath, or None when there is no path or
+                  the result was made from a list.
+        steps     number of locations on the path, or None.
+        cost      accumulated cost of the path, or None when there is no path.
+        expanded  number of locations taken off the frontier and expanded.
+    """
+    def __init__(self, path, cost, expanded):
+        """
+            pre: path is a list of (x,y) locations, a CompactPath or None
+        """
+        if isinstance(path, CompactPath):
+            self.compact, self._path = path, None
+        else:
+            self.compact, self._path = None, path
+        self.cost = cost
+        self.expanded = expanded
+
+    @property
+    def path(self):
+        if self._path is None and self.compact is not None:
+            self._path = list(self.compact)
+        return self._path
+
+    @property
+    def steps(self):
+        if self.compact is not None: return len(self.compact)
+        return None if self._path is None else len(self._path)
+
+    def __repr__(self):
+        return (f'SearchResult(steps={self.steps}, cost={self.cost}, '
+                f'expanded={self.expanded})')
+
+
+class SearchStats:
+    """
+        Counters filled in by an instrumented search.
+
+        expanded        locations taken off the frontier and expanded
+        reopened        expanded locations put back on the frontier because a
+                        cheaper way to them was found
+        generated       neighbors looked at while expanding
+        relaxed         neighbors whose accumulated cost was lowered
+        pushed          entries pushed onto the frontier
+        stale           entries popped for locations already expanded and
+                        skipped (lazy deletion)
+        frontier_max    the most entries the frontier held at once
+        heuristic_calls calls of the heuristic
+
+        With timing=True the seconds spent are also recorded, split into
+        time_neighbors (finding and costing neighbors), time_queue (heap
+        pushes and pops) and time_heuristic, with time_total for the search.
+        Timing calls perf_counter() around every operation, which slows the
+        search down noticeably, so it is off by default.
+    """
+    def __init__(self, timing=False):
+        self.timing = timing
+        self.expanded = 0
+        self.reopened = 0
+        self.generated = 0
+        self.relaxed = 0
+        self.pushed = 0
+        self.stale = 0
+        self.frontier_max = 0
+        self.heuristic_calls = 0
+        self.time_total = 0.0
+        self.time_neighbors = 0.0
+        self.time_queue = 0.0
+        self.time_heuristic = 0.0
+
+    def as_dict(self):
+        """
+            post: returns the counters (and times, with timing) as a dict
+        """
+        d = {k: v for k, v in vars(self).items() if k != 'timing'}
+        if not self.timing:
+            for k in [k for k in d if k.startswith('time_')]: del d[k]
+        return d
+
+    def __repr__(self):
+        return 'SearchStats(' + ', '.join(f'{k}={v}' for k, v in self.as_dict().items()) + ')'
+
+
+def _retrace(came_from, t, w):
+    """
+        pre: came_from holds the code of the move that reached every reached
+             index, _NO_MOVE at the start.
+        post: returns the CompactPath from the start to t
+    """
+    steps = (1, -1, -w, w)
+    runs = []
+    at = t
+    code = came_from[at]
+    while code != _NO_MOVE:
+        at -= steps[code]
+        if runs and runs[-1][0] == code: runs[-1][1] += 1
+        else: runs.append([code, 1])
+        code = came_from[at]
+    runs.reverse()
+    y, x = divmod(at, w)
+    return CompactPath.from_runs((x, y), runs)
+
+
+def a_star_search(graph, start, goal, heuristic='manhattan', stats=None,
+                  on_expand=None, on_relax=None, mode='astar', components=None):
+    """
+        A* search used with a WeightedGrid to
+           find shortest path from start to goal.
+
+        pre: graph is the WeightedGrid, start and goal are (x,y) coordinates,
+             heuristic is the name of a registered heuristic or a factory
+             returning h(index) (see heuristics.py), it must never overestimate
+             the remaining cost.
+             stats is an optional SearchStats to fill in.  on_expand is an
+             optional function called as on_expand((x,y), cost) when a location
+             is expanded, on_relax as on_relax((x,y), (px,py), cost) when a
+             location is reached more cheaply from (px,py).
+             mode is one of SEARCH_MODES.  The bidirectional mode also
+             bounds costs from the start, with the reverse of the heuristic
+             (see heuristics.reverse_heuristic()).  The bidirectional and jps
+             modes fill in only the expanded, pushed, stale and frontier_max
+             counters of stats, and for them cost is the cost from the start
+             of the search side that reached the location.
+             components is an optional ComponentIndex of graph (see
+             components.py).  With it a goal in another region than the
+             start is answered without searching.
+        post: returns a SearchResult holding the path from start to goal, its
+              cost and the number of expanded locations.  The path is None if
+              the goal can not be reached.  Raises ValueError when start or
+              goal is off the grid.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f'unknown search mode {mode!r}, '
+                         f'expected one of {", ".join(SEARCH_MODES)}')
+    w, h = graph.width, graph.height
+    # off the grid a location would wrap to another row, or past the end.
+    for name, p in (('start', start), ('goal', goal)):
+        if not (0 <= p[0] < w and 0 <= p[1] < h):
+            raise ValueError(f'{name} ({p[0]},{p[1]}) is not on the {w}x{h} grid')
+    cells = graph.cells
+    weights = graph.weights
+    s = start[1]*w + start[0]
+    t = goal[1]*w + goal[0]
+    if cells[s] or cells[t]: return SearchResult(None, None, 0)
+    if components is not None and not components.connected(start, goal):
+        return SearchResult(None, None, 0)
+    factory = get_heuristic(heuristic)
+    estimate = factory(graph, goal)
+    if mode == 'bidirectional':
+        # the backward side needs bounds on the cost from start, which on a
+        # weighted grid differ from the costs to start.
+        estimate_back = reverse_heuristic(factory)(graph, start)
+        return _bidirectional(graph, s, t, estimate, estimate_back,
+                              stats, on_expand, on_relax)
+    if mode == 'jps' and weights is None:
+        return _jump_point(graph, s, t, estimate, stats, on_expand, on_relax)
+    if stats is not None or on_expand is not None or on_relax is not None:
+        return _a_star_instrumented(graph, s, t, estimate,
+                                    stats or SearchStats(), on_expand, on_relax)
+
+    masks = graph.masks
+    moves = _index_moves(w)
+
+    # the accumulated cost of reaching each location from start, and the
+    # move each one was reached by.
+    accumulated_cost = array('d', [inf]) * (w*h)
+    came_from = bytearray([_NO_MOVE]) * (w*h)
+    closed = bytearray(w*h)
+    accumulated_cost[s] = 0
+
+    # heap entries are (priority, -cost, tiebreak, index).  Equal priorities
+    # go to the location with the larger cost so far, the one nearest the
+    # goal by the heuristic: on open, uniform cost grids many locations tie
+    # and taking the oldest first would expand all of them.  The tiebreak
+    # counter means indexes are never compared.
+    frontier = [(estimate(s), 0, 0, s)]
+    tiebreak = 1
+    expanded = 0
+
+    while frontier:
+        at = heapq.heappop(frontier)[3]
+
+        # a location can be pushed several times, only the first pop counts.
+        if closed[at]: continue
+        if at == t: break
+        closed[at] = 1
+        expanded += 1
+
+        cost_at = accumulated_cost[at]
+        for offset, d in moves[masks[at]]:
+            to = at + offset
+            new_cost = cost_at + (1 if weights is None else weights[to])
+            if new_cost < accumulated_cost[to]:
+                accumulated_cost[to] = new_cost
+                came_from[to] = d
+                # reopen the location if a cheaper way to it turned up.
+                closed[to] = 0
+                priority = new_cost + estimate(to)
+                heapq.heappush(frontier, (priority, -new_cost, tiebreak, to))
+                tiebreak += 1
+    else:
+        return SearchResult(None, None, expanded)
+
+    # walk the parents back from the goal to build the path.
+    return SearchResult(_retrace(came_from, t, w), accumulated_cost[t], expanded)
+
+
+def _a_star_instrumented(graph, s, t, estimate, stats, on_expand, on_relax):
+    """
+        The search loop of a_star_search() with counters, optional timers and
+        callbacks added.  It must expand locations in the same order as the
+        plain loop.
+    """
+    w, h = graph.width, graph.height
+    weights = graph.weights
+    timing = stats.timing
+    clock = perf_counter if timing else (lambda: 0.0)
+    began = clock()
+
+    def counted(i):
+        stats.heuristic_calls += 1
+        if not timing: return estimate(i)
+        t0 = clock()
+        value = estimate(i)
+        stats.time_heuristic += clock() - t0
+        return value
+
+    masks = graph.masks
+    moves = _index_moves(w)
+    accumulated_cost = array('d', [inf]) * (w*h)
+    came_from = bytearray([_NO_MOVE]) * (w*h)
+    closed = bytearray(w*h)
+    accumulated_cost[s] = 0
+
+    frontier = [(counted(s), 0, 0, s)]
+    stats.pushed += 1
+    stats.frontier_max = max(stats.frontier_max, 1)
+    tiebreak = 1
+    found = False
+
+    while frontier:
+        t0 = clock()
+        at = heapq.heappop(frontier)[3]
+        stats.time_queue += clock() - t0
+
+        if closed[at]:
+            stats.stale += 1
+            continue
+        if at == t:
+            found = True
+            break
+        closed[at] = 1
+        stats.expanded += 1
+
+        y, x = divmod(at, w)
+        cost_at = accumulated_cost[at]
+        if on_expand is not None: on_expand((x, y), cost_at)
+
+        # collect the improved neighbors first so their cost can be timed
+        # apart from the heuristic and the queue.
+        t0 = clock()
+        improved = []
+        for offset, d in moves[masks[at]]:
+            to = at + offset
+            stats.generated += 1
+            new_cost = cost_at + (1 if weights is None else weights[to])
+            if new_cost < accumulated_cost[to]:
+                accumulated_cost[to] = new_cost
+                came_from[to] = d
+                if closed[to]:
+                    closed[to] = 0
+                    stats.reopened += 1
+                improved.append((to, new_cost))
+        stats.time_neighbors += clock() - t0
+
+        for to, new_cost in improved:
+            stats.relaxed += 1
+            if on_relax is not None: on_relax((to % w, to // w), (x, y), new_cost)
+            priority = new_cost + counted(to)
+            t0 = clock()
+            heapq.heappush(frontier, (priority, -new_cost, tiebreak, to))
+            stats.time_queue += clock() - t0
+            tiebreak += 1
+            stats.pushed += 1
+        if len(frontier) > stats.frontier_max: stats.frontier_max = len(frontier)
+
+    stats.time_total += clock() - began
+    if not found: return SearchResult(None, None, stats.expanded)
+    return SearchResult(_retrace(came_from, t, w), accumulated_cost[t], stats.expanded)
+
+
+def _bidirectional(graph, s, t, estimate, estimate_back, stats, on_expand, on_relax):
+    """
+        Bidirectional A* with average potentials (Ikeda et al., Goldberg and
+        Harrelson).  The forward side searches from s, the backward side from
+        t over the reversed edges: stepping from a to b costs the weight of b,
+        so going backward from b to a also costs the weight of b.
+
+        estimate bounds the cost from a location to t and estimate_back the
+        cost from s to it (see reverse_heuristic()).  Both sides are guided by
+        the same potential p(v) = (estimate(v) - estimate_back(v)) / 2, the
+        forward side adding it to its costs and the backward side taking it
+        off.  The two sides then search one graph of nonnegative reduced
+        costs, and the stopping rule of bidirectional Dijkstra holds: best,
+        the cheapest start to goal cost through a location reached by both
+        sides, can't be beaten once the lowest keys of the two frontiers add
+        up to best.  Stopping when either side alone reaches best, as with
+        the plain A* priorities of each side, is much later.
+
+        The side with fewer open locations grows next (Pohl's cardinality
+        rule).  Heap entries left behind by a cheaper push aren't counted.
+    """
+    w, h = graph.width, graph.height
+    weights = graph.weights
+    n = w*h
+    masks = graph.masks
+    moves = _index_moves(w)
+
+    cost_from = (array('d', [inf]) * n, array('d', [inf]) * n)
+    came_from = (bytearray([_NO_MOVE]) * n, bytearray([_NO_MOVE]) * n)
+    closed = (bytearray(n), bytearray(n))
+    frontier = ([((estimate(s) - estimate_back(s))*0.5, 0, 0, s)],
+                [((estimate_back(t) - estimate(t))*0.5, 0, 0, t)])
+    cost_from[0][s] = 0
+    cost_from[1][t] = 0
+    tiebreak = 1
+    grown = [0, 0]
+    # entries per heap for locations since pushed again at a lower cost
+    dead = [0, 0]
+    pushed = stale = frontier_max = 0
+
+    best = inf if s != t else 0
+    meet = s if s == t else -1
+
+    while frontier[0] and frontier[1]:
+        if frontier[0][0][0] + frontier[1][0][0] >= best: break
+        side = 0 if len(frontier[0]) - dead[0] <= len(frontier[1]) - dead[1] else 1
+        g, parents, done, queue = cost_from[side], came_from[side], closed[side], frontier[side]
+        other = cost_from[1 - side]
+        # the potential of the side, p(v) forward and -p(v) backward
+        half = 0.5 if side == 0 else -0.5
+
+        at = heapq.heappop(queue)[3]
+        if done[at]:
+            stale += 1
+            dead[side] -= 1
+            continue
+        done[at] = 1
+        grown[side] += 1
+
+        cost_at = g[at]
+        if on_expand is not None: on_expand((at % w, at // w), cost_at)
+        step = 1 if weights is None else weights[at]
+        for offset, d in moves[masks[at]]:
+            to = at + offset
+            if side == 0: new_cost = cost_at + (1 if weights is None else weights[to])
+            else: new_cost = cost_at + step
+            if new_cost < g[to]:
+                if not done[to] and g[to] < inf: dead[side] += 1
+                g[to] = new_cost
+                parents[to] = d
+                done[to] = 0
+                if on_relax is not None: on_relax((to % w, to // w), (at % w, at // w), new_cost)
+                heapq.heappush(queue, (new_cost + (estimate(to) - estimate_back(to))*half,
+                                       -new_cost, tiebreak, to))
+                tiebreak += 1
+                pushed += 1
+                if new_cost + other[to] < best:
+                    best = new_cost + other[to]
+                    meet = to
+        if len(queue) > frontier_max: frontier_max = len(queue)
+
+    expanded = grown[0] + grown[1]
+    if stats is not None:
+        stats.expanded += expanded
+        stats.pushed += pushed + 2
+        stats.stale += stale
+        stats.frontier_max = max(stats.frontier_max, frontier_max)
+    if meet == -1: return SearchResult(None, None, expanded)
+
+    # the forward moves lead from s to meet.  The backward search reached
+    # meet from t, so the rest of the path is its moves undone in reverse.
+    path = _retrace(came_from[0], meet, w)
+    steps = (1, -1, -w, w)
+    at = meet
+    code = came_from[1][at]
+    while code != _NO_MOVE:
+        path.extend(code ^ 1, 1)
+        at -= steps[code]
+        code = came_from[1][at]
+    return SearchResult(path, best, expanded)
+
+
+def _jump(cells, w, h, x, y, dx, dy, t):
+    """
+        pre: (x,y) is open, (dx,dy) one of the four directions
+        post: returns (index, steps) of the jump point reached by moving from
+              (x,y) in direction (dx,dy): the goal t or the first location with
+              an open neighbor to either side of the direction of travel.
+              Returns (-1, 0) when the run hits a wall or the edge of the grid
+              first; such a run is a dead end that can not lead anywhere.
+    """
+    steps = 0
+    while True:
+        x += dx
+        y += dy
+        if not (0 <= x < w and 0 <= y < h): return -1, 0
+        i = y*w + x
+        if cells[i]: return -1, 0
+        steps += 1
+        if i == t: return i, steps
+        if dx:
+            if (y > 0 and not cells[i - w]) or (y < h - 1 and not cells[i + w]):
+                return i, steps
+        elif (x > 0 and not cells[i - 1]) or (x < w - 1 and not cells[i + 1]):
+            return i, steps
+
+
+def _jump_point(graph, s, t, estimate, stats, on_expand, on_relax):
+    """
+        Jump point search on a uniform cost, 4-connected grid.
+
+        Only jump points are put on the frontier: the start, the goal and the
+        locations where a straight run of travel can turn.  The locations in
+        between have no open neighbor to either side, so every path through
+        them goes straight through and they can be skipped.  Going straight
+        back the way a jump point was reached only leads back to its parent,
+        so that direction is never searched.
+    """
+    w, h = graph.width, graph.height
+    cells = graph.cells
+    n = w*h
+
+    accumulated_cost = array('d', [inf]) * n
+    path_from = array('i', [-1]) * n
+    closed = bytearray(n)
+    # the direction (index into _ORDER) each jump point was reached in.
+    arrived = bytearray([_NO_MOVE]) * n
+    accumulated_cost[s] = 0
+
+    frontier = [(estimate(s), 0, 0, s)]
+    tiebreak = 1
+    expanded = pushed = stale = frontier_max = 0
+    found = False
+
+    while frontier:
+        at = heapq.heappop(frontier)[3]
+        if closed[at]:
+            stale += 1
+            continue
+        if at == t:
+            found = True
+            break
+        closed[at] = 1
+        expanded += 1
+
+        y, x = divmod(at, w)
+        cost_at = accumulated_cost[at]
+        if on_expand is not None: on_expand((x, y), cost_at)
+        back = arrived[at] ^ 1      # E<->W and N<->S are 0<->1 and 2<->3
+        for d, (dx, dy) in enumerate(_ORDER):
+            if d == back: continue
+            to, steps = _jump(cells, w, h, x, y, dx, dy, t)
+            if to == -1: continue
+            new_cost = cost_at + steps
+            if new_cost < accumulated_cost[to]:
+                accumulated_cost[to] = new_cost
+                path_from[to] = at
+                arrived[to] = d
+                closed[to] = 0
+                if on_relax is not None: on_relax(divmod(to, w)[::-1], (x, y), new_cost)
+                heapq.heappush(frontier, (new_cost + estimate(to), -new_cost, tiebreak, to))
+                tiebreak += 1
+                pushed += 1
+        if len(frontier) > frontier_max: frontier_max = len(frontier)
+
+    if stats is not None:
+        stats.expanded += expanded
+        stats.pushed += pushed + 1
+        stats.stale += stale
+        stats.frontier_max = max(stats.frontier_max, frontier_max)
+    if not found: return SearchResult(None, None, expanded)
+
+    # every jump is one straight run, of arrived[at] moves.
+    steps = (1, -1, -w, w)
+    runs = []
+    at = t
+    while at != s:
+        code = arrived[at]
+        runs.append((code, (at - path_from[at]) // steps[code]))
+        at = path_from[at]
+    runs.reverse()
+    y, x = divmod(s, w)
+    return SearchResult(CompactPath.from_runs((x, y), runs), accumulated_cost[t], expanded)
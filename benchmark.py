@@ -0,0 +1,192 @@
+"""
+    Reproducible benchmarks for maze generation, grid building, search and
+    rendering.
+
+    Every (size, seed) pair makes the same maze on every run, so results can
+    be compared between implementations and over time.  For each one the
+    stages below are timed, and their peak memory is measured with tracemalloc
+    in a separate run so the tracing doesn't slow down the timings:
+
+        generate   maze_generator.make_maze() (with new_grid())
+        grid       WeightedGrid.from_maze(), the replacement of walls_from_maze()
+        search     a_star_search() from the maze's start to its goal
+        render     maze_render.ppm_image(), the offscreen raster of the maze
+
+    Results are written as JSON.  Passing an earlier results file with
+    --compare reports every stage that got slower by more than --threshold
+    and exits with status 1 if there are any, so it can guard against
+    regressions.
+
+        python benchmark.py --sizes 80x40,400x200 --out results.json
+        python benchmark.py --sizes 80x40,400x200 --compare results.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from maze_generator import maze_generator
+from weighted_grid import WeightedGrid
+from astar_solver import a_star_search
+from maze_render import ppm_image
+
+SIZES = ((80, 40), (400, 200), (1000, 1000), (2000, 2000), (4000, 4000))
+SEEDS = (0, 1, 2)
+
+
+def measure(fn, repeat=1, memory=True):
+    """
+        pre: fn takes no arguments
+        post: returns (result of fn, best wall time over repeat runs, peak
+              memory in bytes allocated during one traced run or None).
+    """
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        if best is None or elapsed < best: best = elapsed
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, best, peak
+
+
+def bench_maze(width, height, seed, heuristic='manhattan', fast=True,
+               repeat=1, memory=True):
+    """
+        post: returns a list of result dicts, one per stage, for the maze made
+              from (seed, width, height).
+    """
+    def generate():
+        mg = maze_generator(width, height, fast=fast, seed=seed, generate=False)
+        mg.new_grid(width, height)
+        mg.make_maze()
+        return mg
+
+    mg, gen_time, gen_peak = measure(generate, repeat, memory)
+    rows = mg.display()
+    grid, grid_time, grid_peak = measure(
+        lambda: WeightedGrid.from_maze(rows, width, height), repeat, memory)
+    result, search_time, search_peak = measure(
+        lambda: a_star_search(grid, mg.start, mg.goal, heuristic), repeat, memory)
+    _, render_time, render_peak = measure(
+        lambda: ppm_image(grid, mg.start, mg.goal), repeat, memory)
+
+    base = {'width': width, 'height': height, 'seed': seed}
+    return [
+        dict(base, stage='generate', time=gen_time, peak_memory=gen_peak),
+        dict(base, stage='grid', time=grid_time, peak_memory=grid_peak),
+        dict(base, stage='search', time=search_time, peak_memory=search_peak,
+             expanded=result.expanded,
+             path_length=result.steps,
+             nodes_per_second=result.expanded / search_time if search_time else None),
+        dict(base, stage='render', time=render_time, peak_memory=render_peak),
+    ]
+
+
+def run_benchmarks(sizes=SIZES, seeds=SEEDS, heuristic='manhattan', fast=True,
+                   repeat=1, memory=True, progress=None):
+    """
+        post: returns {'meta': ..., 'results': [...]} for every size and seed.
+              progress, if given, is called with each maze's results as they
+              are finished.
+    """
+    results = []
+    for width, height in sizes:
+        for seed in seeds:
+            stages = bench_maze(width, height, seed, heuristic, fast, repeat, memory)
+            results.extend(stages)
+            if progress: progress(stages)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'heuristic': heuristic,
+            'fast': fast,
+            'repeat': repeat,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+        pre: baseline and current are results of run_benchmarks()
+        post: returns a list of (key, baseline time, current time) for every
+              stage present in both that is more than threshold slower now.
+    """
+    def keyed(report):
+        return {(r['width'], r['height'], r['seed'], r['stage']): r['time']
+                for r in report['results']}
+    before, after = keyed(baseline), keyed(current)
+    return [(key, before[key], after[key]) for key in sorted(before.keys() & after.keys())
+            if after[key] > before[key] * (1 + threshold)]
+
+
+def _sizes(text):
+    """ argparse type for 80x40,400x200 lists of sizes """
+    return tuple(tuple(int(v) for v in size.split('x')) for size in text.split(','))
+
+
+def _ints(text):
+    return tuple(int(v) for v in text.split(','))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark maze generation, '
+                                     'grid building, search and rendering.')
+    parser.add_argument('--sizes', type=_sizes, default=SIZES,
+                        help='comma separated WIDTHxHEIGHT list')
+    parser.add_argument('--seeds', type=_ints, default=SEEDS)
+    parser.add_argument('--heuristic', default='manhattan')
+    parser.add_argument('--slow', action='store_true',
+                        help='use the default (not fast) generation mode')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the tracemalloc runs')
+    parser.add_argument('--out', default=None, help='write the JSON results here')
+    parser.add_argument('--compare', default=None,
+                        help='earlier JSON results to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    def progress(stages):
+        for r in stages:
+            line = (f"{r['width']}x{r['height']} seed {r['seed']} "
+                    f"{r['stage']:<8} {r['time']:9.4f}s")
+            if r['peak_memory'] is not None:
+                line += f" {r['peak_memory']/2**20:9.2f} MiB"
+            if 'expanded' in r:
+                line += f" {r['expanded']} expanded"
+                if r['nodes_per_second']: line += f" {r['nodes_per_second']:.0f}/s"
+            print(line, file=sys.stderr)
+
+    report = run_benchmarks(args.sizes, args.seeds, args.heuristic, not args.slow,
+                            args.repeat, not args.no_memory, progress)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for (w, h, seed, stage), before, after in regressions:
+            print(f'regression: {w}x{h} seed {seed} {stage} '
+                  f'{before:.4f}s -> {after:.4f}s', file=sys.stderr)
+        if regressions: sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+    Connected component labelling of a WeightedGrid.
+
+    Every open location gets the label of its connected region, so whether
+    the goal can be reached from the start is a lookup of two labels instead
+    of a search that exhausts the start's whole region before giving up.
+
+    The labels are found in one pass over the rows.  Each row is split into
+    runs of open locations with a regular expression, the places where a row
+    and the row above are both open are found the same way, and the runs they
+    connect are joined with union-find.  Every run is then labelled with one
+    slice assignment, so the work is per run rather than per location.  That
+    beats a breadth first flood fill even on a maze, where most runs are one
+    location long, and open grids with few walls label in a fraction of the
+    time.
+
+    A ComponentIndex listens to its grid (see WeightedGrid.add_listener) and
+    keeps the labels up to date as walls are edited:
+
+        removing a wall joins the regions around it, relabelling all but the
+        largest of them.
+
+        adding a wall can split its region.  Breadth first searches are run in
+        lockstep from the open neighbors of the new wall and stop as soon as
+        all of them have met, or only one is left unfinished; each finished
+        search has walked a whole new region, which gets a new label.  A
+        wall that cuts off a small pocket of a huge region only costs the
+        size of the pocket.
+
+    Weights don't change connectivity, so editing them costs nothing here.
+"""
+import re
+import weakref
+from array import array
+from bisect import bisect_right
+from collections import deque
+
+_OPEN_RUN = re.compile(b'\x00+')
+
+
+class ComponentIndex:
+    """
+        Labels of the connected regions of open locations on a grid.
+
+        labels   array('i') with the region label of every location, -1 for
+                 obstructions.  Labels are not consecutive once the grid has
+                 been edited.
+        sizes    dict of label -> number of locations in the region
+    """
+    def __init__(self, graph, listen=True):
+        """
+            pre: graph is a WeightedGrid
+            post: every location is labelled.  With listen the index follows
+                  later edits of the grid until close() is called.
+        """
+        # only a weak reference to the grid is kept, so indexes cached per
+        # grid (see components_for) don't keep their grids alive.
+        self._graph = weakref.ref(graph)
+        self.width = graph.width
+        self._label(graph)
+        self._listening = listen
+        if listen: graph.add_listener(self._on_change)
+
+    def close(self):
+        """
+            post: the index stops following edits of its grid
+        """
+        graph = self._graph()
+        if self._listening and graph is not None:
+            graph.remove_listener(self._on_change)
+        self._listening = False
+
+    def _label(self, graph):
+        """
+            post: labels and sizes are rebuilt from graph
+        """
+        w, h = graph.width, graph.height
+        cells = bytes(graph.cells)
+        # union-find over the runs, numbered in row order.  Roots are always
+        # linked under the lower numbered one, so parent[r] <= r holds
+        # throughout and the labelling pass below needs no find().
+        parent = []
+        spans = []
+
+        above = above_starts = None
+        above_first = 0
+        for y in range(h):
+            base = y*w
+            row = cells[base:base + w]
+            found = [m.span() for m in _OPEN_RUN.finditer(cells, base, base + w)]
+            if not found:
+                above = None
+                continue
+            first = len(parent)
+            starts = [a - base for a, _ in found]
+            parent.extend(range(first, first + len(found)))
+            spans.extend(found)
+            if above is not None:
+                # locations open in both rows, found by or-ing the rows as
+                # big integers.  Each run of them joins one run above to one
+                # run below.
+                both = (int.from_bytes(above, 'big') | int.from_bytes(row, 'big')).to_bytes(w, 'big')
+                for m in _OPEN_RUN.finditer(both):
+                    p = m.start()
+                    a = above_first + bisect_right(above_starts, p) - 1
+                    while parent[a] != a:
+                        parent[a] = parent[parent[a]]
+                        a = parent[a]
+                    b = first + bisect_right(starts, p) - 1
+                    while parent[b] != b:
+                        parent[b] = parent[parent[b]]
+                        b = parent[b]
+                    if a < b: parent[b] = a
+                    elif b < a: parent[a] = b
+            above, above_starts, above_first = row, starts, first
+
+        self.labels = labels = array('i', [-1]) * (w*h)
+        self.sizes = sizes = {}
+        names = {}
+        for run, (a, b) in enumerate(spans):
+            # parent[run] < run was already pointed at its root.
+            root = parent[run] = parent[parent[run]]
+            label = names.get(root)
+            if label is None: label = names[root] = len(names)
+            if b - a == 1: labels[a] = label
+            else: labels[a:b] = array('i', [label]) * (b - a)
+            sizes[label] = sizes.get(label, 0) + b - a
+        self._next_label = len(names)
+        self.version = graph.version
+
+    @property
+    def count(self):
+        """
+            post: returns the number of connected regions
+        """
+        return len(self.sizes)
+
+    def label(self, location):
+        """
+            pre: location (x,y) on the grid
+            post: returns the region label of location, -1 for an obstruction
+        """
+        return self.labels[location[1]*self.width + location[0]]
+
+    def connected(self, start, goal):
+        """
+            pre: start and goal are (x,y) locations on the grid
+            post: returns True when both are open and in the same region
+        """
+        w = self.width
+        a = self.labels[start[1]*w + start[0]]
+        return a != -1 and a == self.labels[goal[1]*w + goal[0]]
+
+    def size(self, location):
+        """
+            post: returns the number of locations in the region of location,
+                  0 for an obstruction.
+        """
+        return self.sizes.get(self.label(location), 0)
+
+    def _on_change(self, graph, changed):
+        """
+            Grid listener, repairs the labels of every edited location.
+        """
+        if changed is None:
+            self._label(graph)
+            return
+        cells, labels = graph.cells, self.labels
+        for i in changed:
+            if cells[i] and labels[i] != -1: self._added_wall(graph, i)
+            elif not cells[i] and labels[i] == -1: self._removed_wall(graph, i)
+        self.version = graph.version
+
+    def _relabel(self, graph, start, old, new):
+        """
+            post: the region labelled old around start is labelled new,
+                  returns its size.
+        """
+        labels, adjacent = self.labels, graph.adjacent
+        labels[start] = new
+        queue = deque([start])
+        count = 0
+        while queue:
+            at = queue.popleft()
+            count += 1
+            for to in adjacent(at):
+                if labels[to] == old:
+                    labels[to] = new
+                    queue.append(to)
+        return count
+
+    def _removed_wall(self, graph, i):
+        """
+            post: the new open location i joins the regions next to it
+        """
+        labels, sizes = self.labels, self.sizes
+        # neighbors opened by the same edit are still unlabelled, they join
+        # when their own turn comes.
+        around = {labels[j]: j for j in graph.adjacent(i) if labels[j] != -1}
+        if not around:
+            label = self._next_label
+            self._next_label += 1
+            labels[i] = label
+            sizes[label] = 1
+            return
+        keep = max(around, key=sizes.get)
+        labels[i] = keep
+        sizes[keep] += 1
+        for label, j in around.items():
+            if label == keep: continue
+            sizes[keep] += self._relabel(graph, j, label, keep)
+            del sizes[label]
+
+    def _added_wall(self, graph, i):
+        """
+            post: i is no longer labelled and, if that cut its region in
+                  parts, every part but one gets a new label.
+        """
+        labels, sizes, adjacent = self.labels, self.sizes, graph.adjacent
+        old = labels[i]
+        labels[i] = -1
+        sizes[old] -= 1
+        starts = adjacent(i)
+        if not starts:
+            del sizes[old]
+            return
+        if len(starts) == 1: return
+
+        # one search per neighbor, owner maps each location seen to the
+        # search that saw it first and group joins the searches that met.
+        k = len(starts)
+        group = list(range(k))
+
+        def find(a):
+            while group[a] != a: a = group[a]
+            return a
+
+        owner = {j: g for g, j in enumerate(starts)}
+        queues = [deque([j]) for j in starts]
+        live = set(range(k))
+        finished = []
+        while len(live) > 1:
+            for g in range(k):
+                queue = queues[g]
+                if not queue: continue
+                at = queue.popleft()
+                for to in adjacent(at):
+                    seen = owner.get(to)
+                    if seen is None:
+                        owner[to] = g
+                        queue.append(to)
+                        continue
+                    a, b = find(g), find(seen)
+                    if a != b:
+                        group[b] = a
+                        live.discard(b)
+                if not queue:
+                    root = find(g)
+                    if root in live and not any(queues[j] for j in range(k) if find(j) == root):
+                        live.discard(root)
+                        finished.append(root)
+                if len(live) <= 1: break
+
+        # the part still being searched keeps the old label, the finished
+        # parts were walked completely and are relabelled.
+        for root in finished:
+            label = self._next_label
+            self._next_label += 1
+            part = [j for j, g in owner.items() if find(g) == root]
+            for j in part: labels[j] = label
+            sizes[label] = len(part)
+            sizes[old] -= len(part)
+
+
+_component_cache = weakref.WeakKeyDictionary()
+
+
+def components_for(graph):
+    """
+        pre: graph is a WeightedGrid
+        post: returns the shared ComponentIndex of graph, labelling it the
+              first time.  It follows edits made through the grid's methods.
+    """
+    index = _component_cache.get(graph)
+    if index is None or index.version != graph.version:
+        if index is not None: index.close()
+        index = _component_cache[graph] = ComponentIndex(graph)
+    return index
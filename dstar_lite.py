@@ -0,0 +1,242 @@
+"""
+    Incremental replanning with D* Lite.
+
+    a_star_search() starts from nothing on every call, so after a wall is
+    toggled or a weight changed the whole search is done again.  D* Lite
+    (Koenig and Likhachev) searches backward from the goal and keeps its
+    results between calls: g is the cost to the goal found by the last search
+    and rhs the one step lookahead min(cost(u,v) + g[v]) over the neighbors v
+    of u.  A location is consistent when the two agree.  An edit only makes
+    the edited location and its neighbors inconsistent, and replanning
+    re-expands just the inconsistent locations that can affect the path, so
+    its cost follows the size of the region the edit touched rather than the
+    size of the maze.
+
+    The planner listens to the grid (see WeightedGrid.add_listener), so edits
+    made with add_wall(), remove_wall() and set_weight() are picked up by the
+    next plan():
+
+        planner = DStarLite(grid, start, goal)
+        result = planner.plan()
+        grid.add_wall((5, 3))
+        result = planner.plan()         # repairs the previous search
+        planner.move_to(result.path[1]) # the agent took a step
+        result = planner.plan()
+        planner.close()
+
+    Like the rest of the solver, locations are integer indexes into flat
+    arrays, and the priority queue is a heapq with lazy deletion.
+"""
+import heapq
+from array import array
+from math import inf
+from astar_solver import SearchResult, _ORDER, _REVERSED_ORDER
+from heuristics import get_heuristic, alt
+
+
+class DStarLite:
+    """
+        Incremental planner for the shortest path from a (moving) start to a
+        fixed goal on a WeightedGrid whose walls and weights change.
+    """
+    def __init__(self, graph, start, goal, heuristic='manhattan'):
+        """
+            pre: graph is a WeightedGrid, start and goal (x,y) locations.
+                 heuristic is a heuristic name or factory (see heuristics.py)
+                 that stays a lower bound when the grid is edited.  The
+                 geometric heuristics do as long as no weight drops below the
+                 smallest one at the time they were made; if one does the
+                 planner starts over.  The landmark heuristic does not, so
+                 'alt' is refused with a ValueError.
+            post: the planner is registered as a listener of graph.  Nothing
+                  is searched until plan() is called.
+        """
+        self.factory = get_heuristic(heuristic)
+        if self.factory is alt:
+            raise ValueError('the alt heuristic goes stale when the grid is '
+                             'edited, use a geometric heuristic')
+        self.graph = graph
+        self.start = tuple(start)
+        self.goal = tuple(goal)
+        self._pending = []
+        self._reset()
+        graph.add_listener(self._on_change)
+
+    def _reset(self):
+        """
+            post: all search state is thrown away, as if the planner was new
+        """
+        graph = self.graph
+        n = graph.width*graph.height
+        self._estimate = self.factory(graph, self.start)
+        self._min_weight = graph.min_weight()
+        self.g = array('d', [inf]) * n
+        self.rhs = array('d', [inf]) * n
+        self._queue = []
+        self._tiebreak = 0
+        self._km = 0
+        self._pending = []
+        t = self.goal[1]*graph.width + self.goal[0]
+        self.rhs[t] = 0
+        self._push(t)
+
+    def close(self):
+        """
+            post: the planner stops listening to its grid
+        """
+        self.graph.remove_listener(self._on_change)
+
+    def _on_change(self, graph, changed):
+        """
+            Grid listener, edits are queued and handled by the next plan().
+        """
+        if changed is None or self._pending is None:
+            self._pending = None
+            return
+        if graph.weights is not None:
+            if any(graph.weights[i] < self._min_weight for i in changed):
+                # the heuristic may now overestimate, start again.
+                self._pending = None
+                return
+        self._pending.extend(changed)
+
+    def _key(self, i):
+        m = min(self.g[i], self.rhs[i])
+        return (m + self._estimate(i) + self._km, m)
+
+    def _push(self, i):
+        k1, k2 = self._key(i)
+        heapq.heappush(self._queue, (k1, k2, self._tiebreak, i))
+        self._tiebreak += 1
+
+    def _update(self, i):
+        """
+            post: rhs[i] is recomputed from the neighbors of i, and i is queued
+                  if it is left inconsistent.
+        """
+        graph = self.graph
+        w, h = graph.width, graph.height
+        cells, weights, g = graph.cells, graph.weights, self.g
+        y, x = divmod(i, w)
+        if (x, y) != self.goal:
+            best = inf
+            if not cells[i]:
+                for dx, dy in _ORDER:
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < w and 0 <= ny < h): continue
+                    to = ny*w + nx
+                    if cells[to]: continue
+                    c = g[to] + (1 if weights is None else weights[to])
+                    if c < best: best = c
+            self.rhs[i] = best
+        if g[i] != self.rhs[i]: self._push(i)
+
+    def _update_around(self, i):
+        """
+            post: i and the locations next to it are updated, which covers
+                  every move into and out of i.
+        """
+        w, h = self.graph.width, self.graph.height
+        y, x = divmod(i, w)
+        self._update(i)
+        for dx, dy in _ORDER:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < w and 0 <= ny < h: self._update(ny*w + nx)
+
+    def move_to(self, location):
+        """
+            pre: location (x,y) is the new start, usually the next step of the
+                 last path planned
+            post: later plans start from location.  The search state is kept,
+                  the queue keys are corrected lazily through km.
+        """
+        location = tuple(location)
+        if location == self.start: return
+        graph = self.graph
+        self._km += self._estimate(location[1]*graph.width + location[0])
+        self.start = location
+        self._estimate = self.factory(graph, location)
+
+    def plan(self):
+        """
+            post: returns a SearchResult with the cheapest path from start to
+                  goal on the grid as it is now, its cost, and the number of
+                  locations expanded by this call.  Edits made since the last
+                  call are repaired first.
+        """
+        graph = self.graph
+        w, h = graph.width, graph.height
+        cells = graph.cells
+        s = self.start[1]*w + self.start[0]
+        t = self.goal[1]*w + self.goal[0]
+
+        if self._pending is None: self._reset()
+        elif self._pending:
+            for i in set(self._pending): self._update_around(i)
+            self._pending = []
+        if cells[s] or cells[t]: return SearchResult(None, None, 0)
+
+        g, rhs, queue = self.g, self.rhs, self._queue
+        weights = graph.weights
+        expanded = 0
+        while queue:
+            k1, k2, _, u = queue[0]
+            if g[u] == rhs[u]:
+                # consistent locations left on the queue are stale entries.
+                heapq.heappop(queue)
+                continue
+            if (k1, k2) >= self._key(s) and rhs[s] <= g[s]: break
+            heapq.heappop(queue)
+            new = self._key(u)
+            if (k1, k2) < new:
+                # queued before km grew, put it back with its current key.
+                heapq.heappush(queue, (new[0], new[1], self._tiebreak, u))
+                self._tiebreak += 1
+                continue
+            expanded += 1
+            y, x = divmod(u, w)
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                # u got cheaper, so may every open neighbor moving onto it.
+                if cells[u]: continue
+                step = 1 if weights is None else weights[u]
+                for dx, dy in _ORDER:
+                    nx, ny = x + dx, y + dy
+                    if not (0 <= nx < w and 0 <= ny < h): continue
+                    to = ny*w + nx
+                    if cells[to] or (nx, ny) == self.goal: continue
+                    if g[u] + step < rhs[to]:
+                        rhs[to] = g[u] + step
+                        self._push(to)
+            else:
+                g[u] = inf
+                self._update_around(u)
+
+        if g[s] == inf and rhs[s] == inf: return SearchResult(None, None, expanded)
+        return SearchResult(self._path(s, t), rhs[s], expanded)
+
+    def _path(self, s, t):
+        """
+            post: returns the path from s to t found by following the cheapest
+                  neighbor at every step, with the tie-break of neighbors().
+        """
+        graph = self.graph
+        w, h = graph.width, graph.height
+        cells, weights, g = graph.cells, graph.weights, self.g
+        y, x = divmod(s, w)
+        path = [(x, y)]
+        at = s
+        while at != t and len(path) <= w*h:
+            best, step = inf, -1
+            for dx, dy in (_REVERSED_ORDER if (x + y) % 2 == 0 else _ORDER):
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < w and 0 <= ny < h): continue
+                to = ny*w + nx
+                if cells[to]: continue
+                c = g[to] + (1 if weights is None else weights[to])
+                if c < best: best, step = c, to
+            if step == -1: return None
+            at = step
+            y, x = divmod(at, w)
+            path.append((x, y))
+        return path
@@ -0,0 +1,294 @@
+"""
+    Distance and flow fields toward a single goal.
+
+    When many agents head for the same goal, searching once per agent redoes
+    the same work over and over.  A FlowField searches once, backward from the
+    goal, and keeps for every location the cost of its cheapest path to the
+    goal and the move that starts that path.  An agent anywhere on the grid
+    then finds its next move with one lookup:
+
+        field = FlowField(grid, mg.goal)
+        for agent in agents:
+            agent.location = field.next_step(agent.location)
+
+    The field is built with
+
+        a breadth first wavefront, one level at a time, on a grid with uniform
+        cost.
+
+        Dial's bucket queue when every weight is a small whole number (at most
+        DIAL_MAX_WEIGHT); the buckets form a ring of DIAL_MAX_WEIGHT + 1 lists,
+        so there is no heap.
+
+        Dijkstra's algorithm with a heapq for any other weights.
+
+    Moving costs the weight of the location moved onto, as in the solver, so
+    the field holds the reverse distances of heuristics.distances().
+
+    The field listens to its grid (see WeightedGrid.add_listener).  An edit
+    throws away only the locations whose path to the goal went through an
+    edited location, reseeds them from their neighbors and runs Dijkstra from
+    there, so a small edit costs about as much as the region it changes.
+"""
+import heapq
+import weakref
+from array import array
+from math import inf
+from astar_solver import CompactPath, SearchResult, _ORDER, _NO_MOVE
+
+# the largest weight the bucket queue is used for.
+DIAL_MAX_WEIGHT = 255
+
+
+class FlowField:
+    """
+        Costs to the goal and next moves toward it for every location.
+
+        dist    array('d') with the cost of the cheapest path from every
+                location to the goal, inf where the goal can't be reached.
+        moves   bytearray with the first move of that path for every
+                location, an index into the solver's E W N S order (see
+                CompactPath), or 255 at the goal and where it can't be reached.
+        updated the number of locations recomputed by the last build or
+                repair.
+    """
+    def __init__(self, graph, goal, listen=True):
+        """
+            pre: graph is a WeightedGrid and goal an (x,y) location on it
+            post: the field is built.  With listen it follows later edits of
+                  the grid until close() is called.
+        """
+        # only a weak reference to the grid is kept, like ComponentIndex.
+        self._graph = weakref.ref(graph)
+        self.width, self.height = graph.width, graph.height
+        self.goal = tuple(goal)
+        self._build(graph)
+        self._listening = listen
+        if listen: graph.add_listener(self._on_change)
+
+    def close(self):
+        """
+            post: the field stops following edits of its grid
+        """
+        graph = self._graph()
+        if self._listening and graph is not None:
+            graph.remove_listener(self._on_change)
+        self._listening = False
+
+    def _build(self, graph):
+        """
+            post: dist and moves are rebuilt from graph
+        """
+        n = graph.width*graph.height
+        self.dist = array('d', [inf]) * n
+        self.moves = bytearray([_NO_MOVE]) * n
+        self.updated = 0
+        self.version = graph.version
+        t = self.goal[1]*graph.width + self.goal[0]
+        if graph.cells[t]: return
+        self.dist[t] = 0
+        weights = graph.weights
+        if weights is None: self._wavefront(graph, t)
+        elif _dial_weights(weights): self._dial(graph, t, int(max(weights)))
+        else: self._propagate(graph, [t])
+
+    def _wavefront(self, graph, t):
+        """
+            post: the field is filled in by a breadth first search from t, one
+                  level at a time.
+        """
+        w, n = graph.width, graph.width*graph.height
+        cells, dist, moves = graph.cells, self.dist, self.moves
+        frontier = [t]
+        d = 0
+        count = 1
+        while frontier:
+            d += 1
+            level = []
+            for at in frontier:
+                # a location reached from at moves onto at, so its move is
+                # the opposite of the step from at to it.
+                x = at % w
+                to = at + 1
+                if x + 1 < w and not cells[to] and dist[to] == inf:
+                    dist[to] = d; moves[to] = 1; level.append(to)
+                to = at - 1
+                if x > 0 and not cells[to] and dist[to] == inf:
+                    dist[to] = d; moves[to] = 0; level.append(to)
+                to = at - w
+                if to >= 0 and not cells[to] and dist[to] == inf:
+                    dist[to] = d; moves[to] = 3; level.append(to)
+                to = at + w
+                if to < n and not cells[to] and dist[to] == inf:
+                    dist[to] = d; moves[to] = 2; level.append(to)
+            count += len(level)
+            frontier = level
+        self.updated = count
+
+    def _dial(self, graph, t, top):
+        """
+            pre: every weight is a whole number from 0 to top
+            post: the field is filled in by Dijkstra's algorithm from t with a
+                  ring of top + 1 buckets as its queue.
+        """
+        w, n = graph.width, graph.width*graph.height
+        cells, weights, dist, moves = graph.cells, graph.weights, self.dist, self.moves
+        size = top + 1
+        buckets = [[] for _ in range(size)]
+        buckets[0].append(t)
+        queued = 1
+        d = 0
+        count = 0
+        while queued:
+            bucket = buckets[d % size]
+            # a weight of 0 adds to the bucket being emptied.
+            while bucket:
+                at = bucket.pop()
+                queued -= 1
+                if dist[at] != d: continue
+                count += 1
+                nd = d + int(weights[at])
+                x = at % w
+                for to, ok, move in ((at + 1, x + 1 < w, 1), (at - 1, x > 0, 0),
+                                     (at - w, at >= w, 3), (at + w, at + w < n, 2)):
+                    if ok and not cells[to] and nd < dist[to]:
+                        dist[to] = nd
+                        moves[to] = move
+                        buckets[nd % size].append(to)
+                        queued += 1
+            d += 1
+        self.updated = count
+
+    def _propagate(self, graph, seeds):
+        """
+            pre: the seeds have their tentative dist set
+            post: Dijkstra's algorithm is run from the seeds, lowering the dist
+                  (and setting the move) of every location it improves.
+        """
+        w, n = graph.width, graph.width*graph.height
+        cells, weights, dist, moves = graph.cells, graph.weights, self.dist, self.moves
+        heap = [(dist[i], i) for i in seeds if dist[i] < inf]
+        heapq.heapify(heap)
+        count = 0
+        while heap:
+            d, at = heapq.heappop(heap)
+            if d > dist[at]: continue
+            count += 1
+            nd = d + (1 if weights is None else weights[at])
+            x = at % w
+            for to, ok, move in ((at + 1, x + 1 < w, 1), (at - 1, x > 0, 0),
+                                 (at - w, at >= w, 3), (at + w, at + w < n, 2)):
+                if ok and not cells[to] and nd < dist[to]:
+                    dist[to] = nd
+                    moves[to] = move
+                    heapq.heappush(heap, (nd, to))
+        self.updated = count
+
+    def _on_change(self, graph, changed):
+        """
+            Grid listener, repairs the field around the edited locations.
+        """
+        t = self.goal[1]*graph.width + self.goal[0]
+        if changed is None or t in changed:
+            self._build(graph)
+            return
+        w, h = graph.width, graph.height
+        cells, weights, dist, moves = graph.cells, graph.weights, self.dist, self.moves
+
+        # every location whose path ran through an edited location, found by
+        # walking the moves backward.
+        stale = set(changed)
+        queue = list(stale)
+        while queue:
+            at = queue.pop()
+            y, x = divmod(at, w)
+            for d, (dx, dy) in enumerate(_ORDER):
+                nx, ny = x - dx, y - dy
+                if not (0 <= nx < w and 0 <= ny < h): continue
+                to = ny*w + nx
+                if moves[to] == d and to not in stale:
+                    stale.add(to)
+                    queue.append(to)
+        for i in stale:
+            dist[i] = inf
+            moves[i] = _NO_MOVE
+
+        # reseed them from the neighbors whose paths still hold.
+        for i in stale:
+            if cells[i]: continue
+            y, x = divmod(i, w)
+            for d, (dx, dy) in enumerate(_ORDER):
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < w and 0 <= ny < h): continue
+                to = ny*w + nx
+                if cells[to] or to in stale or dist[to] == inf: continue
+                c = dist[to] + (1 if weights is None else weights[to])
+                if c < dist[i]:
+                    dist[i] = c
+                    moves[i] = d
+        # an edited location is queued even when it stays unreachable for
+        # now, a lowered weight improves the locations around it.
+        self._propagate(graph, stale)
+        self.version = graph.version
+
+    def distance(self, location):
+        """
+            pre: location (x,y) on the grid
+            post: returns the cost of the cheapest path from location to the
+                  goal, inf if there is none.
+        """
+        return self.dist[location[1]*self.width + location[0]]
+
+    def direction(self, location):
+        """
+            pre: location (x,y) on the grid
+            post: returns the (dx,dy) of the next move toward the goal, None
+                  at the goal and where it can't be reached.
+        """
+        move = self.moves[location[1]*self.width + location[0]]
+        return None if move == _NO_MOVE else _ORDER[move]
+
+    def next_step(self, location):
+        """
+            pre: location (x,y) on the grid
+            post: returns the location to move to next, None at the goal and
+                  where it can't be reached.
+        """
+        move = self.moves[location[1]*self.width + location[0]]
+        if move == _NO_MOVE: return None
+        dx, dy = _ORDER[move]
+        return (location[0] + dx, location[1] + dy)
+
+    def path(self, start):
+        """
+            pre: start (x,y) on the grid
+            post: returns a SearchResult with the path from start to the goal
+                  given by the moves (expanded is 0), or with no path if the
+                  goal can't be reached.
+        """
+        w = self.width
+        x, y = start
+        i = y*w + x
+        cost = self.dist[i]
+        if cost == inf: return SearchResult(None, None, 0)
+        compact = CompactPath(tuple(start))
+        moves = self.moves
+        move = moves[i]
+        while move != _NO_MOVE:
+            dx, dy = _ORDER[move]
+            count = 0
+            while moves[i] == move:
+                i += dy*w + dx
+                count += 1
+            compact.extend(move, count)
+            move = moves[i]
+        return SearchResult(compact, cost, 0)
+
+
+def _dial_weights(weights):
+    """
+        post: returns True when every weight is a whole number from 0 to
+              DIAL_MAX_WEIGHT, so the bucket queue can be used.
+    """
+    return (0 <= min(weights, default=0) and max(weights, default=0) <= DIAL_MAX_WEIGHT
+            and all(map(float.is_integer, weights)))
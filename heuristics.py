@@ -0,0 +1,307 @@
+"""
+    Heuristics for the A* solver.
+
+    A heuristic here is a factory: it is called once per search as
+    factory(graph, goal) and returns a function h(index) giving an estimate of
+    the remaining cost from a grid index to the goal.  Doing the setup once per
+    search keeps the per node call cheap, and lets heuristics like ALT look up
+    precomputed tables.
+
+    Every heuristic in the registry is admissible on a WeightedGrid: the
+    geometric ones are scaled by the smallest weight on the grid so they never
+    overestimate, and the landmark (ALT) heuristic is built from exact
+    shortest path distances.
+
+    Moving costs the weight of the location moved onto, so on a weighted grid
+    the cost from a to b is not the cost from b to a.  A factory bounds the
+    cost from a location to the goal; one whose bound doesn't also hold the
+    other way round has a reverse attribute, the factory bounding the cost
+    from the goal to a location (see reverse_heuristic()).  The geometric
+    heuristics are symmetric and need none.
+
+        manhattan   |dx| + |dy|, exact on an open 4-connected grid
+        octile      distance allowing diagonal moves, weaker than manhattan on
+                    the 4-connected grid but kept for comparison
+        euclidean   straight line distance
+        zero        always 0, turns A* into Dijkstra's algorithm
+        alt         landmark lower bounds, see Landmarks
+"""
+import heapq
+import weakref
+from array import array
+from collections import deque
+from math import sqrt, inf
+
+_SQRT2_MINUS_1 = sqrt(2) - 1
+
+
+def manhattan(graph, goal):
+    """
+        pre: graph is a WeightedGrid and goal an (x,y) location
+        post: returns h(index), the manhattan distance to goal
+    """
+    w, m = graph.width, graph.min_weight()
+    gx, gy = goal
+
+    def h(i):
+        y, x = divmod(i, w)
+        return (abs(x - gx) + abs(y - gy)) * m
+    return h
+
+
+def octile(graph, goal):
+    """
+        pre: graph is a WeightedGrid and goal an (x,y) location
+        post: returns h(index), the octile distance to goal
+    """
+    w, m = graph.width, graph.min_weight()
+    gx, gy = goal
+
+    def h(i):
+        y, x = divmod(i, w)
+        dx, dy = abs(x - gx), abs(y - gy)
+        if dx < dy: dx, dy = dy, dx
+        return (dx + _SQRT2_MINUS_1*dy) * m
+    return h
+
+
+def euclidean(graph, goal):
+    """
+        pre: graph is a WeightedGrid and goal an (x,y) location
+        post: returns h(index), the straight line distance to goal
+    """
+    w, m = graph.width, graph.min_weight()
+    gx, gy = goal
+
+    def h(i):
+        y, x = divmod(i, w)
+        return sqrt((x - gx)**2 + (y - gy)**2) * m
+    return h
+
+
+def zero(graph, goal):
+    """
+        post: returns h(index) that is always 0 (Dijkstra's algorithm)
+    """
+    return lambda i: 0
+
+
+def distances(graph, source, reverse=False):
+    """
+        pre: graph is a WeightedGrid and source is an index of a traversable
+             location.
+        post: returns an array with the cost of the shortest path from source
+              to every index (inf where unreachable).  If reverse is True the
+              costs are of the paths from every index to source instead, which
+              differ from the forward ones when weights are set since moving
+              costs the weight of the location moved onto.
+    """
+    n = graph.width*graph.height
+    dist = array('d', [inf]) * n
+    dist[source] = 0
+    adjacent = graph.adjacent
+    weights = graph.weights
+
+    # uniform cost, a breadth first wavefront is enough.
+    if weights is None:
+        queue = deque([source])
+        while queue:
+            at = queue.popleft()
+            d = dist[at] + 1
+            for to in adjacent(at):
+                if dist[to] == inf:
+                    dist[to] = d
+                    queue.append(to)
+        return dist
+
+    heap = [(0, source)]
+    while heap:
+        d, at = heapq.heappop(heap)
+        if d > dist[at]: continue
+        for to in adjacent(at):
+            # forward, moving at -> to costs the weight of to.
+            # reverse, the path runs to -> at, costing the weight of at.
+            nd = d + (weights[at] if reverse else weights[to])
+            if nd < dist[to]:
+                dist[to] = nd
+                heapq.heappush(heap, (nd, to))
+    return dist
+
+
+class Landmarks:
+    """
+        ALT (A*, Landmarks, Triangle inequality) heuristic.
+
+        A handful of landmarks are picked near the border of the maze and the
+        exact distance from each landmark to every location is computed once.
+        For any location v, goal t and landmark L the triangle inequality gives
+            d(v,t) >= d(L,t) - d(L,v)   and   d(v,t) >= d(v,L) - d(t,L)
+        and the largest of these bounds (and the manhattan distance) is used as
+        the estimate.  In mazes the
+        geometric heuristics say little about the true (winding) distance while
+        these bounds are often close to exact, so repeated queries on the same
+        maze expand far fewer nodes.
+
+        The tables cost one array the size of the grid per landmark (two when
+        weights are set, as distances to and from a landmark then differ).
+        A Landmarks object is itself a heuristic factory, so it can be passed
+        straight to a_star_search().
+    """
+    def __init__(self, graph, count=4):
+        """
+            pre: graph is a WeightedGrid, count the number of landmarks wanted
+            post: landmarks are chosen by farthest point selection among the
+                  open locations next to the border, and their distance tables
+                  are built.
+        """
+        self.width = graph.width
+        self.version = graph.version
+        self.count = count
+        self.landmarks = []
+        self.forward = []
+        self.backward = []
+
+        candidates = self._border_candidates(graph)
+        if not candidates: return
+        # the minimum distance from each candidate to the landmarks so far
+        closest = {c: inf for c in candidates}
+        pick = candidates[0]
+        while len(self.landmarks) < count:
+            forward = distances(graph, pick)
+            self.landmarks.append(pick)
+            self.forward.append(forward)
+            self.backward.append(forward if graph.weights is None
+                                 else distances(graph, pick, reverse=True))
+            for c in candidates:
+                if forward[c] < closest[c]: closest[c] = forward[c]
+            # next landmark is the candidate farthest from all the others.
+            # unreachable candidates (inf) are taken first, so each separate
+            # region of the maze gets a landmark of its own.
+            pick = max(candidates, key=closest.__getitem__)
+            if closest[pick] == 0: break
+
+    @staticmethod
+    def _border_candidates(graph):
+        """
+            post: returns the indexes of the open locations within two steps of
+                  the edge of the grid (maze borders are usually walls), or all
+                  open locations if there are none there.
+        """
+        w, h, cells = graph.width, graph.height, graph.cells
+        out = []
+        for i, c in enumerate(cells):
+            if c: continue
+            y, x = divmod(i, w)
+            if x < 2 or y < 2 or x >= w - 2 or y >= h - 2: out.append(i)
+        return out or [i for i, c in enumerate(cells) if not c]
+
+    def __call__(self, graph, goal, reverse=False):
+        """
+            pre: graph is the WeightedGrid the landmarks were built for and
+                 goal an (x,y) location
+            post: returns h(index), the best landmark bound on the cost from
+                  index to goal, or with reverse from goal to index.
+        """
+        t = goal[1]*self.width + goal[0]
+        # the bounds from index to goal with the tables swapped are the
+        # bounds from goal to index.
+        pairs = zip(self.backward, self.forward) if reverse else zip(self.forward, self.backward)
+        tables = [(f, f[t], b, b[t]) for f, b in pairs]
+        geometric = manhattan(graph, goal)
+
+        def h(i):
+            best = geometric(i)
+            for f, ft, b, bt in tables:
+                fi = f[i]
+                # reachability is symmetric on the grid, so the goal being
+                # reachable from a landmark while i isn't (or the other way
+                # around) means there is no path from i to the goal.
+                if (fi == inf) != (ft == inf): return inf
+                if fi == inf: continue
+                d = ft - fi
+                if d > best: best = d
+                d = b[i] - bt
+                if d > best: best = d
+            return best
+        return h
+
+    def reverse(self, graph, goal):
+        """
+            post: returns h(index), the best landmark bound on the cost from
+                  goal to index
+        """
+        return self(graph, goal, reverse=True)
+
+
+# landmarks are expensive to build, so one set is kept per grid for as long as
+# the grid is alive.
+_landmark_cache = weakref.WeakKeyDictionary()
+
+
+def landmarks_for(graph, count=4):
+    """
+        pre: graph is a WeightedGrid
+        post: returns the Landmarks for graph, building them the first time
+              and again after the grid is edited.
+    """
+    lm = _landmark_cache.get(graph)
+    if lm is None or lm.count < count or lm.version != graph.version:
+        lm = _landmark_cache[graph] = Landmarks(graph, count)
+    return lm
+
+
+def alt(graph, goal):
+    """
+        post: returns h(index) from the cached landmarks of graph
+    """
+    return landmarks_for(graph)(graph, goal)
+
+
+def _alt_reverse(graph, goal):
+    """
+        post: returns h(index) from the cached landmarks of graph, bounding
+              the cost from goal to index
+    """
+    return landmarks_for(graph)(graph, goal, reverse=True)
+
+
+alt.reverse = _alt_reverse
+
+
+HEURISTICS = {
+    'manhattan': manhattan,
+    'octile': octile,
+    'euclidean': euclidean,
+    'zero': zero,
+    'alt': alt,
+}
+
+
+def register_heuristic(name, factory):
+    """
+        pre: factory is called as factory(graph, goal) and returns h(index)
+        post: the heuristic can be selected by name in a_star_search()
+    """
+    HEURISTICS[name] = factory
+
+
+def reverse_heuristic(factory):
+    """
+        pre: factory is a heuristic factory
+        post: returns the factory bounding the cost from the goal to a
+              location, factory itself when it is symmetric.
+    """
+    return getattr(factory, 'reverse', factory)
+
+
+def get_heuristic(heuristic):
+    """
+        pre: heuristic is the name of a registered heuristic or a factory
+        post: returns the factory.  Raises ValueError for unknown names.
+    """
+    if not isinstance(heuristic, str): return heuristic
+    try:
+        return HEURISTICS[heuristic]
+    except KeyError:
+        raise ValueError(f'unknown heuristic {heuristic!r}, choose one of '
+                         f'{", ".join(sorted(HEURISTICS))}') from None
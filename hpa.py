@@ -0,0 +1,502 @@
+"""
+    Hierarchical path finding (HPA*) for very large grids.
+
+    The grid is cut into square clusters of cluster_size locations a side.
+    Wherever two neighboring clusters are both open on either side of their
+    border there is an entrance; an entrance shorter than 6 locations gets one
+    transition (a pair of locations facing each other across the border) in
+    its middle, a longer one gets a transition at each end.  The locations of
+    the transitions are the nodes of an abstract graph, joined by
+
+        inter edges  across the border, one move
+        intra edges  between the nodes of one cluster, costing the cheapest
+                     path between them that stays inside the cluster
+
+    Building the abstract graph searches each cluster once per node, and is
+    done once per maze.  A query then only searches the start's and goal's
+    clusters to link them to the abstract graph, runs A* over the abstract
+    graph, and refines the abstract path into locations one cluster at a time.
+    waypoints() stops before refining, and refine() can refine only the first
+    few legs, so an agent that replans often never pays for the whole path.
+
+    Paths are near optimal rather than optimal: they are the cheapest paths
+    that pass between clusters through transitions, usually a few percent
+    longer than the shortest path.  Use a_star_search() when the exact
+    shortest path is needed.
+
+    The graph follows edits of its grid (see WeightedGrid.add_listener).  An
+    edit marks its cluster dirty, and the neighboring cluster too when the
+    edited location lies on their border, and only dirty clusters are rebuilt,
+    on the next query.
+
+    save() writes the abstract graph to a file next to the maze, and load()
+    reads it back for a grid with the same content, which is checked with the
+    grid's fingerprint (see path_cache.grid_fingerprint):
+
+        clusters = ClusterGraph(grid)
+        clusters.save('maze.amz.hpa')
+        ...
+        clusters = ClusterGraph.load(grid, 'maze.amz.hpa')
+        result = clusters.search(start, goal)
+"""
+import heapq
+import struct
+import sys
+import weakref
+from array import array
+from collections import deque
+from math import inf
+from astar_solver import CompactPath, SearchResult, _ORDER
+from heuristics import manhattan
+from path_cache import grid_fingerprint
+
+MAGIC = b'HPA1'
+VERSION = 1
+# magic, version, cluster size, width, height, grid fingerprint, transition
+# count, intra edge count.  Followed by the transitions as int32 (a, b)
+# pairs, the intra edges as int32 (u, v) pairs and their float64 costs.
+HEADER = struct.Struct('<4sHHII16sQQ')
+
+# entrances at least this long get a transition at each end.
+_LONG_ENTRANCE = 6
+
+_VERTICAL, _HORIZONTAL = 0, 1
+
+
+def _local_costs(graph, box, source, reverse=False):
+    """
+        pre: box is (x0, y0, x1, y1), the locations x0 <= x < x1 and
+             y0 <= y < y1 the search may use.  source is an open index in box.
+        post: returns (cost, came) dicts.  cost maps every index reachable
+              from source inside box to the cost of the cheapest path from
+              source to it, or from it to source when reverse is True.  came
+              maps each index to the one before it on that path (-1 for
+              source).
+    """
+    w = graph.width
+    cells, weights = graph.cells, graph.weights
+    x0, y0, x1, y1 = box
+    cost = {source: 0}
+    came = {source: -1}
+    if weights is None:
+        # uniform cost, breadth first order is cheapest first.
+        queue = deque([source])
+        while queue:
+            at = queue.popleft()
+            y, x = divmod(at, w)
+            step = cost[at] + 1
+            for dx, dy in _ORDER:
+                nx, ny = x + dx, y + dy
+                if not (x0 <= nx < x1 and y0 <= ny < y1): continue
+                to = ny*w + nx
+                if cells[to] or to in cost: continue
+                cost[to] = step
+                came[to] = at
+                queue.append(to)
+        return cost, came
+
+    done = set()
+    heap = [(0, source)]
+    while heap:
+        c, at = heapq.heappop(heap)
+        if at in done: continue
+        done.add(at)
+        y, x = divmod(at, w)
+        for dx, dy in _ORDER:
+            nx, ny = x + dx, y + dy
+            if not (x0 <= nx < x1 and y0 <= ny < y1): continue
+            to = ny*w + nx
+            if cells[to]: continue
+            # moving from a to b costs the weight of b, so backward from b
+            # to a it is the weight of the location being left.
+            new_cost = c + (weights[at] if reverse else weights[to])
+            if new_cost < cost.get(to, inf):
+                cost[to] = new_cost
+                came[to] = at
+                heapq.heappush(heap, (new_cost, to))
+    return cost, came
+
+
+class ClusterGraph:
+    """
+        The HPA* abstraction of a WeightedGrid.
+
+        nodes        cluster -> set of the node indexes in it
+        intra        cluster -> {u: {v: cost}} of the edges inside it
+        inter        node -> {v: cost} of the edges across borders
+        transitions  border -> list of (a, b) index pairs, a on the left or
+                     top side.  Borders are (0, c) for the vertical border on
+                     the right of cluster c and (1, c) for the horizontal
+                     border below it.
+    """
+    def __init__(self, graph, cluster_size=16, build=True):
+        """
+            pre: graph is a WeightedGrid, cluster_size the side of a cluster
+            post: the abstract graph is built (unless build is False, as
+                  load() does) and follows later edits of graph.
+        """
+        if cluster_size < 2: raise ValueError('cluster_size must be at least 2')
+        self._graph = weakref.ref(graph)
+        self.size = cluster_size
+        self.width, self.height = graph.width, graph.height
+        self.columns = -(-graph.width // cluster_size)
+        self.rows = -(-graph.height // cluster_size)
+        self.nodes = {}
+        self.intra = {}
+        self.inter = {}
+        self.transitions = {}
+        self._dirty_borders = set()
+        self._dirty_clusters = set()
+        if build: self._mark_all()
+        graph.add_listener(self._on_change)
+
+    @property
+    def graph(self):
+        return self._graph()
+
+    def close(self):
+        """
+            post: the abstraction stops following edits of its grid
+        """
+        graph = self._graph()
+        if graph is not None: graph.remove_listener(self._on_change)
+
+    # -- clusters and borders ----------------------------------------------
+
+    def cluster(self, i):
+        """
+            post: returns the cluster of index i
+        """
+        y, x = divmod(i, self.width)
+        return (y // self.size)*self.columns + x // self.size
+
+    def box(self, c):
+        """
+            post: returns (x0, y0, x1, y1), the locations of cluster c
+        """
+        cy, cx = divmod(c, self.columns)
+        s = self.size
+        return (cx*s, cy*s, min(self.width, (cx + 1)*s), min(self.height, (cy + 1)*s))
+
+    def _borders(self, c):
+        """
+            post: returns the borders of cluster c
+        """
+        cy, cx = divmod(c, self.columns)
+        borders = []
+        if cx + 1 < self.columns: borders.append((_VERTICAL, c))
+        if cx > 0: borders.append((_VERTICAL, c - 1))
+        if cy + 1 < self.rows: borders.append((_HORIZONTAL, c))
+        if cy > 0: borders.append((_HORIZONTAL, c - self.columns))
+        return borders
+
+    def _mark_all(self):
+        for c in range(self.columns*self.rows):
+            self._dirty_clusters.add(c)
+            self._dirty_borders.update(self._borders(c))
+
+    def _on_change(self, graph, changed):
+        """
+            Grid listener, marks the clusters and borders an edit touches.
+        """
+        if changed is None:
+            self._mark_all()
+            return
+        s, w = self.size, self.width
+        for i in changed:
+            y, x = divmod(i, w)
+            c = self.cluster(i)
+            self._dirty_clusters.add(c)
+            if x % s == s - 1 and x + 1 < w:
+                self._dirty_borders.add((_VERTICAL, c))
+                self._dirty_clusters.add(c + 1)
+            if x % s == 0 and x > 0:
+                self._dirty_borders.add((_VERTICAL, c - 1))
+                self._dirty_clusters.add(c - 1)
+            if y % s == s - 1 and y + 1 < self.height:
+                self._dirty_borders.add((_HORIZONTAL, c))
+                self._dirty_clusters.add(c + self.columns)
+            if y % s == 0 and y > 0:
+                self._dirty_borders.add((_HORIZONTAL, c - self.columns))
+                self._dirty_clusters.add(c - self.columns)
+
+    def _find_transitions(self, border):
+        """
+            post: returns the (a, b) transitions across border
+        """
+        graph = self.graph
+        w, cells = self.width, graph.cells
+        kind, c = border
+        x0, y0, x1, y1 = self.box(c)
+        if kind == _VERTICAL:
+            # pairs (x1-1, y) | (x1, y) down the border
+            pairs = [(y*w + x1 - 1, y*w + x1) for y in range(y0, y1)]
+        else:
+            pairs = [((y1 - 1)*w + x, y1*w + x) for x in range(x0, x1)]
+        transitions = []
+        run = []
+        for a, b in pairs + [(None, None)]:
+            if a is not None and not cells[a] and not cells[b]:
+                run.append((a, b))
+                continue
+            if len(run) >= _LONG_ENTRANCE:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run)//2])
+            run = []
+        return transitions
+
+    def _set_transitions(self, border, transitions):
+        """
+            post: the inter edges of border are replaced by transitions
+        """
+        graph = self.graph
+        weights = graph.weights
+        for a, b in self.transitions.get(border, ()):
+            for u, v in ((a, b), (b, a)):
+                edges = self.inter.get(u)
+                if edges is not None:
+                    edges.pop(v, None)
+                    if not edges: del self.inter[u]
+        self.transitions[border] = transitions
+        for a, b in transitions:
+            self.inter.setdefault(a, {})[b] = 1 if weights is None else weights[b]
+            self.inter.setdefault(b, {})[a] = 1 if weights is None else weights[a]
+
+    def _cluster_nodes(self, c):
+        """
+            post: returns the set of transition locations inside cluster c
+        """
+        nodes = set()
+        for border in self._borders(c):
+            for a, b in self.transitions.get(border, ()):
+                nodes.add(a if border[1] == c else b)
+        return nodes
+
+    def _build_cluster(self, c):
+        """
+            post: nodes[c] and intra[c] are computed from the grid
+        """
+        graph = self.graph
+        nodes = self.nodes[c] = self._cluster_nodes(c)
+        box = self.box(c)
+        edges = self.intra[c] = {}
+        for u in nodes:
+            cost = _local_costs(graph, box, u)[0]
+            edges[u] = {v: cost[v] for v in nodes if v != u and v in cost}
+
+    def refresh(self):
+        """
+            post: every dirty border and cluster is rebuilt.  Called by the
+                  queries, and by save().
+        """
+        if self._dirty_borders:
+            for border in self._dirty_borders:
+                self._set_transitions(border, self._find_transitions(border))
+            self._dirty_borders = set()
+        if self._dirty_clusters:
+            for c in self._dirty_clusters: self._build_cluster(c)
+            self._dirty_clusters = set()
+
+    # -- queries -----------------------------------------------------------
+
+    def waypoints(self, start, goal):
+        """
+            pre: start and goal are (x,y) locations on the grid
+            post: returns (waypoints, cost): the indexes of the abstract path
+                  from start to goal, start and goal included, and its cost.
+                  Consecutive waypoints are either adjacent or in the same
+                  cluster.  Returns (None, None) when there is no path.
+        """
+        return self._abstract_search(start, goal)[:2]
+
+    def _abstract_search(self, start, goal):
+        """
+            post: returns (waypoints, cost, abstract nodes expanded)
+        """
+        self.refresh()
+        graph = self.graph
+        w, cells = self.width, graph.cells
+        s = start[1]*w + start[0]
+        t = goal[1]*w + goal[0]
+        if cells[s] or cells[t]: return None, None, 0
+        if s == t: return [s], 0.0, 0
+
+        cs, ct = self.cluster(s), self.cluster(t)
+        # link start and goal to the nodes of their clusters.
+        from_start = _local_costs(graph, self.box(cs), s)[0]
+        start_edges = {v: from_start[v] for v in self.nodes[cs] if v in from_start and v != s}
+        if cs == ct and t in from_start: start_edges[t] = from_start[t]
+        to_goal = _local_costs(graph, self.box(ct), t, reverse=True)[0]
+        goal_edges = {u: to_goal[u] for u in self.nodes[ct] if u in to_goal}
+
+        estimate = manhattan(graph, goal)
+        intra, inter = self.intra, self.inter
+        cost = {s: 0}
+        came = {s: -1}
+        closed = set()
+        frontier = [(estimate(s), 0, s)]
+        tiebreak = 1
+        expanded = 0
+        while frontier:
+            at = heapq.heappop(frontier)[2]
+            if at in closed: continue
+            if at == t: break
+            closed.add(at)
+            expanded += 1
+            if at == s:
+                edges = list(start_edges.items()) + list(inter.get(s, {}).items())
+            else:
+                edges = list(intra[self.cluster(at)].get(at, {}).items())
+                edges += inter.get(at, {}).items()
+                if at in goal_edges: edges.append((t, goal_edges[at]))
+            cost_at = cost[at]
+            for to, step in edges:
+                new_cost = cost_at + step
+                if new_cost < cost.get(to, inf):
+                    cost[to] = new_cost
+                    came[to] = at
+                    closed.discard(to)
+                    heapq.heappush(frontier, (new_cost + estimate(to), tiebreak, to))
+                    tiebreak += 1
+        else:
+            return None, None, expanded
+
+        path = []
+        at = t
+        while at != -1:
+            path.append(at)
+            at = came[at]
+        path.reverse()
+        return path, float(cost[t]), expanded
+
+    def refine(self, waypoints, legs=None):
+        """
+            pre: waypoints as returned by waypoints()
+            post: returns the CompactPath through the first legs legs of
+                  waypoints (all of them by default).
+        """
+        graph = self.graph
+        w = self.width
+        y, x = divmod(waypoints[0], w)
+        path = CompactPath((x, y))
+        steps = {1: 0, -1: 1, -w: 2, w: 3}
+        last = len(waypoints) - 1 if legs is None else min(legs, len(waypoints) - 1)
+        for u, v in zip(waypoints[:last], waypoints[1:last + 1]):
+            if self.cluster(u) != self.cluster(v):
+                path.extend(steps[v - u], 1)
+                continue
+            came = _local_costs(graph, self.box(self.cluster(u)), u)[1]
+            moves = []
+            at = v
+            while at != u:
+                moves.append(steps[at - came[at]])
+                at = came[at]
+            for code in reversed(moves): path.extend(code, 1)
+        return path
+
+    def search(self, start, goal):
+        """
+            pre: start and goal are (x,y) locations on the grid
+            post: returns a SearchResult with the refined path, its cost and
+                  the number of abstract nodes expanded.
+        """
+        waypoints, cost, expanded = self._abstract_search(start, goal)
+        if waypoints is None: return SearchResult(None, None, expanded)
+        return SearchResult(self.refine(waypoints), cost, expanded)
+
+    # -- files -------------------------------------------------------------
+
+    def save(self, filename):
+        """
+            post: the abstract graph is written to filename
+        """
+        self.refresh()
+        pairs = array('i')
+        for border in sorted(self.transitions):
+            for a, b in self.transitions[border]: pairs.extend((a, b))
+        ends = array('i')
+        costs = array('d')
+        for c in sorted(self.intra):
+            for u, edges in self.intra[c].items():
+                for v, cost in edges.items():
+                    ends.extend((u, v))
+                    costs.append(cost)
+        if sys.byteorder != 'little':
+            for layer in (pairs, ends, costs): layer.byteswap()
+        with open(filename, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.size, self.width, self.height,
+                                grid_fingerprint(self.graph), len(pairs)//2, len(costs)))
+            for layer in (pairs, ends, costs): f.write(layer.tobytes())
+
+    @classmethod
+    def load(cls, graph, filename):
+        """
+            pre: filename was written by save() for a grid with the same
+                 content as graph
+            post: returns the ClusterGraph read from filename, raises
+                  ValueError if it isn't one or was saved for another maze.
+        """
+        with open(filename, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            raise ValueError('not a cluster graph file')
+        (_, version, size, width, height, fingerprint,
+         transitions, edges) = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f'unsupported cluster graph version {version}')
+        if (width, height) != (graph.width, graph.height) or \
+                fingerprint != grid_fingerprint(graph):
+            raise ValueError('cluster graph was saved for a different maze')
+
+        offset = HEADER.size
+        layers = []
+        for code, count in (('i', 2*transitions), ('i', 2*edges), ('d', edges)):
+            layer = array(code)
+            layer.frombytes(data[offset:offset + count*layer.itemsize])
+            if sys.byteorder != 'little': layer.byteswap()
+            offset += count*layer.itemsize
+            layers.append(layer)
+        pairs, ends, costs = layers
+
+        clusters = cls(graph, size, build=False)
+        by_border = {}
+        for k in range(0, len(pairs), 2):
+            a, b = pairs[k], pairs[k + 1]
+            kind = _HORIZONTAL if b - a == width else _VERTICAL
+            by_border.setdefault((kind, clusters.cluster(a)), []).append((a, b))
+        for c in range(clusters.columns*clusters.rows):
+            for border in clusters._borders(c):
+                if border not in clusters.transitions:
+                    clusters._set_transitions(border, by_border.get(border, []))
+        for c in range(clusters.columns*clusters.rows):
+            clusters.nodes[c] = clusters._cluster_nodes(c)
+            clusters.intra[c] = {u: {} for u in clusters.nodes[c]}
+        for k, cost in enumerate(costs):
+            u, v = ends[2*k], ends[2*k + 1]
+            clusters.intra[clusters.cluster(u)][u][v] = cost
+        return clusters
+
+
+_cluster_cache = weakref.WeakKeyDictionary()
+
+
+def clusters_for(graph, cluster_size=16):
+    """
+        pre: graph is a WeightedGrid
+        post: returns the shared ClusterGraph of graph, building it the first
+              time.  It follows edits made through the grid's methods.
+    """
+    clusters = _cluster_cache.get(graph)
+    if clusters is None or clusters.size != cluster_size:
+        if clusters is not None: clusters.close()
+        clusters = _cluster_cache[graph] = ClusterGraph(graph, cluster_size)
+    return clusters
+
+
+def hpa_search(graph, start, goal, cluster_size=16):
+    """
+        post: returns the SearchResult of clusters_for(graph).search(start,
+              goal), a near optimal path found hierarchically.
+    """
+    return clusters_for(graph, cluster_size).search(start, goal)
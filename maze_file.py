@@ -0,0 +1,231 @@
+"""
+    Binary maze file format.
+
+    A maze file is a fixed 64 byte little-endian header followed by an
+    optional weight layer and the cell plane:
+
+        offset  size  field
+        0       4     magic b'AMZ1'
+        4       2     format version (1)
+        6       2     flags, bit 0 = weight layer present, bit 1 = packed cells
+        8       4     width
+        12      4     height
+        16      16    start x, start y, goal x, goal y (-1 when not set)
+        32      8     seed (-1 when not known)
+        40      8     offset of the weight layer (0 when absent)
+        48      8     offset of the cell plane
+        56      8     reserved
+
+        weights   width*height float64, row major
+        cells     width*height bytes, 1 for an obstruction and 0 for open
+                  floor, exactly the layout of WeightedGrid.cells.  Packed
+                  files store each row as ceil(width/8) bytes instead, one bit
+                  per location, most significant bit first.
+
+    load_maze() memory maps the file copy-on-write and hands memoryviews of the
+    weight layer and the (unpacked) cell plane straight to WeightedGrid, so
+    loading does no copying and pages are only read as they are touched.
+    Edits to a loaded grid never reach the file.
+
+    write_maze() takes the maze as an iterable of text rows and writes them one
+    at a time, so a maze can be streamed to disk without holding it all.
+"""
+import mmap
+import struct
+import sys
+from array import array
+from weighted_grid import WeightedGrid, wall_flags
+
+MAGIC = b'AMZ1'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIiiiiqQQ8x')
+
+FLAG_WEIGHTS = 1
+FLAG_PACKED = 2
+
+# translations between rows of 0/1 flags and the '0'/'1' digits used to pack
+# them through int(), and back.
+_TO_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+_FROM_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+class MazeHeader:
+    """
+        The header fields of a maze file.  start and goal are (x,y) tuples or
+        None, seed is an int or None.
+    """
+    def __init__(self, width, height, start=None, goal=None, seed=None,
+                 weights=False, packed=False):
+        self.width = width
+        self.height = height
+        self.start = start
+        self.goal = goal
+        self.seed = seed
+        self.weights = weights
+        self.packed = packed
+
+    @property
+    def stride(self):
+        """
+            post: returns the number of bytes one row takes in the cell plane
+        """
+        return (self.width + 7) // 8 if self.packed else self.width
+
+    @property
+    def weights_offset(self):
+        return HEADER.size if self.weights else 0
+
+    @property
+    def cells_offset(self):
+        n = self.width*self.height
+        return HEADER.size + (8*n if self.weights else 0)
+
+    def pack(self):
+        """
+            post: returns the header as bytes
+        """
+        flags = (FLAG_WEIGHTS if self.weights else 0) | (FLAG_PACKED if self.packed else 0)
+        sx, sy = self.start if self.start is not None else (-1, -1)
+        gx, gy = self.goal if self.goal is not None else (-1, -1)
+        seed = -1 if self.seed is None else self.seed
+        return HEADER.pack(MAGIC, VERSION, flags, self.width, self.height,
+                           sx, sy, gx, gy, seed, self.weights_offset,
+                           self.cells_offset)
+
+    @classmethod
+    def unpack(cls, data):
+        """
+            pre: data holds at least the first HEADER.size bytes of a file
+            post: returns the MazeHeader, raises ValueError if data is not a
+                  maze file header.
+        """
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            raise ValueError('not a binary maze file')
+        (_, version, flags, width, height, sx, sy, gx, gy, seed,
+         _, _) = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(f'unsupported maze file version {version}')
+        return cls(width, height,
+                   start=None if sx < 0 else (sx, sy),
+                   goal=None if gx < 0 else (gx, gy),
+                   seed=None if seed < 0 else seed,
+                   weights=bool(flags & FLAG_WEIGHTS),
+                   packed=bool(flags & FLAG_PACKED))
+
+
+def _pack_row(flags, stride):
+    """
+        pre: flags is a row of 0/1 bytes
+        post: returns the row packed to stride bytes, one bit per location
+    """
+    digits = flags.translate(_TO_DIGITS).ljust(stride*8, b'0')
+    return int(digits, 2).to_bytes(stride, 'big')
+
+
+def _unpack_row(data, width):
+    """
+        pre: data is one packed row
+        post: returns the first width locations of the row as 0/1 bytes
+    """
+    digits = bin(int.from_bytes(data, 'big'))[2:].zfill(len(data)*8)
+    return digits[:width].encode('ascii').translate(_FROM_DIGITS)
+
+
+def _write(filename, header, weights, rows):
+    """
+        pre: rows yields height rows of width 0/1 flag bytes
+        post: writes header, weights (when header.weights) and rows to filename
+    """
+    stride = header.stride
+    with open(filename, 'wb') as f:
+        f.write(header.pack())
+        if header.weights:
+            layer = array('d', weights)
+            if sys.byteorder != 'little': layer.byteswap()
+            f.write(layer.tobytes())
+        count = 0
+        for flags in rows:
+            if len(flags) != header.width:
+                raise ValueError(f'row {count} has {len(flags)} locations, '
+                                 f'expected {header.width}')
+            f.write(_pack_row(flags, stride) if header.packed else flags)
+            count += 1
+        if count != header.height:
+            raise ValueError(f'got {count} rows, expected {header.height}')
+
+
+def write_maze(filename, width, height, rows, start=None, goal=None, seed=None,
+               weights=None, packed=False):
+    """
+        pre: rows is an iterable of height rows of maze text ('#' is a wall),
+             each width characters long.  weights is an optional sequence of
+             width*height numbers.
+        post: the maze is written to filename, consuming rows one at a time.
+    """
+    header = MazeHeader(width, height, start, goal, seed,
+                        weights is not None, packed)
+    _write(filename, header, weights, (wall_flags(row) for row in rows))
+
+
+def save_grid(filename, grid, start=None, goal=None, seed=None, packed=False):
+    """
+        pre: grid is a WeightedGrid
+        post: the grid, with its weights if any, is written to filename
+    """
+    w = grid.width
+    header = MazeHeader(w, grid.height, start, goal, seed,
+                        grid.weights is not None, packed)
+    rows = (bytes(grid.cells[i:i+w]) for i in range(0, w*grid.height, w))
+    _write(filename, header, grid.weights, rows)
+
+
+def read_header(filename):
+    """
+        post: returns the MazeHeader of the maze file
+    """
+    with open(filename, 'rb') as f:
+        return MazeHeader.unpack(f.read(HEADER.size))
+
+
+def load_maze(filename):
+    """
+        pre: filename is a binary maze file, or a text maze like cool_maze.txt
+        post: returns (grid, header).  Binary files are memory mapped and the
+              grid's cells and weights are memoryviews of the mapping (packed
+              cells are unpacked into a bytearray).  Text mazes are read into a
+              new grid and get a header with no start, goal or seed.
+    """
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            f.seek(0)
+            rows = [line.rstrip(b'\r\n') for line in f]
+            grid = WeightedGrid.from_maze(rows)
+            return grid, MazeHeader(grid.width, grid.height)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    header = MazeHeader.unpack(mm)
+    w, h = header.width, header.height
+    n = w*h
+    if len(mm) < header.cells_offset + header.stride*h:
+        raise ValueError('maze file is truncated')
+    view = memoryview(mm)
+
+    weights = None
+    if header.weights:
+        start = header.weights_offset
+        weights = view[start:start + 8*n].cast('d')
+        if sys.byteorder != 'little':
+            weights = array('d', weights.tobytes())
+            weights.byteswap()
+
+    start = header.cells_offset
+    if header.packed:
+        stride = header.stride
+        cells = bytearray(n)
+        for y in range(h):
+            row = view[start + y*stride:start + (y+1)*stride]
+            cells[y*w:(y+1)*w] = _unpack_row(row, w)
+    else:
+        cells = view[start:start + n]
+
+    return WeightedGrid(w, h, cells, weights), header
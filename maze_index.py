@@ -0,0 +1,181 @@
+"""
+    Batch solving of many (start, goal) queries against one maze.
+
+    Prim's algorithm in maze_generator carves a perfect maze: every open
+    location is reachable from every other one by exactly one path, so the
+    corridors form a tree.  On such a maze the shortest path between two
+    locations is the tree path through their lowest common ancestor (LCA), and
+    no search is needed at all.
+
+    MazeIndex roots the corridor tree once and stores, per location, its
+    parent, depth and a single "jump" pointer laid out in a skew binary pattern
+    (Myers' jump pointers).  Any ancestor, and so the LCA, is then found in
+    O(log n) steps with O(n) memory, giving path lengths in O(log n) and paths
+    in O(path length).
+
+    Grids with weights or loops are not trees, and solve_batch() falls back to
+    A* for them, sharing the landmark tables between all the queries.
+"""
+from array import array
+from collections import deque
+from astar_solver import SearchResult, a_star_search
+
+
+class MazeIndex:
+    """
+        Precomputed LCA index over the corridor tree of a maze.
+
+        is_tree is True when the open locations of the grid form a forest and
+        every move costs 1, which is when distance() and path() are exact.
+    """
+    def __init__(self, graph):
+        """
+            pre: graph is a WeightedGrid
+            post: the open locations are walked breadth first from one root per
+                  connected region, recording parent, depth, jump pointer and
+                  region of each.  is_tree records whether the result is exact.
+        """
+        self.graph = graph
+        self.version = graph.version
+        self.width = w = graph.width
+        n = w*graph.height
+        cells = graph.cells
+        adjacent = graph.adjacent
+
+        self.parent = parent = array('i', [-1]) * n
+        self.depth = depth = array('i', [0]) * n
+        self.jump = jump = array('i', [-1]) * n
+        self.region = region = array('i', [-1]) * n
+
+        # a forest has (open locations - regions) edges, any more means a loop.
+        nodes = edges = regions = 0
+        for i, c in enumerate(cells):
+            if c: continue
+            nodes += 1
+            x = i % w
+            if x + 1 < w and not cells[i+1]: edges += 1
+            if i + w < n and not cells[i+w]: edges += 1
+
+        for root, c in enumerate(cells):
+            if c or region[root] != -1: continue
+            parent[root] = jump[root] = root
+            region[root] = regions
+            queue = deque([root])
+            while queue:
+                p = queue.popleft()
+                jp = jump[p]
+                # skew binary jump pointers: jump two steps of equal length
+                # combine into one three times as long, otherwise jump to p.
+                if depth[p] - depth[jp] == depth[jp] - depth[jump[jp]]:
+                    leaf_jump = jump[jp]
+                else:
+                    leaf_jump = p
+                for v in adjacent(p):
+                    if region[v] != -1: continue
+                    region[v] = regions
+                    parent[v] = p
+                    depth[v] = depth[p] + 1
+                    jump[v] = leaf_jump
+                    queue.append(v)
+            regions += 1
+
+        self.regions = regions
+        self.is_tree = graph.weights is None and edges == nodes - regions
+
+    def _ancestor(self, v, d):
+        """
+            pre: v is an index, d is at most the depth of v
+            post: returns the ancestor of v at depth d
+        """
+        depth, jump, parent = self.depth, self.jump, self.parent
+        while depth[v] > d:
+            if depth[jump[v]] >= d: v = jump[v]
+            else: v = parent[v]
+        return v
+
+    def lca(self, u, v):
+        """
+            pre: u and v are indexes of open locations in the same region
+            post: returns the index of their lowest common ancestor
+        """
+        depth, jump, parent = self.depth, self.jump, self.parent
+        if depth[u] > depth[v]: u = self._ancestor(u, depth[v])
+        elif depth[v] > depth[u]: v = self._ancestor(v, depth[u])
+        # at equal depths the jump pointers have equal lengths, so both sides
+        # can jump together whenever that does not skip past the ancestor.
+        while u != v:
+            if jump[u] != jump[v]: u, v = jump[u], jump[v]
+            else: u, v = parent[u], parent[v]
+        return u
+
+    def connected(self, start, goal):
+        """
+            pre: start and goal are (x,y) locations on the grid
+            post: returns True if both are open and in the same region
+        """
+        s = start[1]*self.width + start[0]
+        t = goal[1]*self.width + goal[0]
+        return self.region[s] != -1 and self.region[s] == self.region[t]
+
+    def distance(self, start, goal):
+        """
+            pre: is_tree is True, start and goal are (x,y) locations
+            post: returns the number of moves between them in O(log n), or
+                  None if they are not connected.
+        """
+        if not self.connected(start, goal): return None
+        s = start[1]*self.width + start[0]
+        t = goal[1]*self.width + goal[0]
+        depth = self.depth
+        return depth[s] + depth[t] - 2*depth[self.lca(s, t)]
+
+    def path(self, start, goal):
+        """
+            pre: is_tree is True, start and goal are (x,y) locations
+            post: returns the list of (x,y) locations from start to goal, or
+                  None if they are not connected.
+        """
+        if not self.connected(start, goal): return None
+        w, parent = self.width, self.parent
+        s = start[1]*w + start[0]
+        t = goal[1]*w + goal[0]
+        top = self.lca(s, t)
+
+        up, down = [], []
+        while s != top:
+            up.append(s)
+            s = parent[s]
+        while t != top:
+            down.append(t)
+            t = parent[t]
+        up.append(top)
+        up.extend(reversed(down))
+        return [(i % w, i // w) for i in up]
+
+
+def solve_batch(graph, queries, index=None, heuristic='alt'):
+    """
+        pre: graph is a WeightedGrid, queries is an iterable of (start, goal)
+             pairs of (x,y) locations.  index is an optional MazeIndex already
+             built for graph, it is rebuilt if the grid was edited since.
+        post: returns a list with one SearchResult per query, in order.  Perfect
+              mazes are answered from the MazeIndex (expanded is 0), any other
+              grid is searched with A* using heuristic, which defaults to the
+              landmark heuristic so its tables are shared by the whole batch.
+              Raises ValueError for a query with a location off the grid.
+    """
+    if index is None or index.version != graph.version: index = MazeIndex(graph)
+    results = []
+    w, h = graph.width, graph.height
+    for start, goal in queries:
+        for name, p in (('start', start), ('goal', goal)):
+            if not (0 <= p[0] < w and 0 <= p[1] < h):
+                raise ValueError(f'{name} ({p[0]},{p[1]}) is not on the {w}x{h} grid')
+        if not index.connected(start, goal):
+            results.append(SearchResult(None, None, 0))
+        elif index.is_tree:
+            path = index.path(start, goal)
+            results.append(SearchResult(path, len(path) - 1, 0))
+        else:
+            results.append(a_star_search(graph, start, goal, heuristic))
+    return results
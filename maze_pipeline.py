@@ -0,0 +1,104 @@
+"""
+    Headless dataset pipeline: generate and solve many mazes on all cores.
+
+    Each maze is generated and solved by a worker in a ProcessPoolExecutor.
+    Maze number k of a run uses the seed (seed + k), so a run is reproducible
+    no matter how the work is scheduled and any single maze can be made again
+    from its seed and size.  Results are yielded as the workers finish them,
+    and grids cross the process boundary as the compact one byte per location
+    cells of a WeightedGrid rather than as lists of characters.
+
+    From the command line, results are written as one JSON object per line:
+
+        python maze_pipeline.py --count 1000 --width 201 --height 101 --seed 0
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from maze_generator import maze_generator
+from weighted_grid import WeightedGrid
+from astar_solver import a_star_search
+
+
+def generate_and_solve(seed, width, height, heuristic='manhattan', keep_grid=False):
+    """
+        pre: seed is an int, width and height the size of the maze.
+        post: generates the maze for seed, solves it from its start to its goal
+              and returns a dict of the seed, dimensions, start, goal, path
+              length, nodes expanded and timings in seconds.  With keep_grid
+              the cells of the grid are included as bytes under 'cells'.
+    """
+    t0 = time.perf_counter()
+    mg = maze_generator(width, height, fast=True, seed=seed)
+    t1 = time.perf_counter()
+    grid = WeightedGrid.from_maze(mg.display(), width, height)
+    t2 = time.perf_counter()
+    result = a_star_search(grid, mg.start, mg.goal, heuristic)
+    t3 = time.perf_counter()
+
+    record = {
+        'seed': seed,
+        'width': width,
+        'height': height,
+        'start': mg.start,
+        'goal': mg.goal,
+        'path_length': result.steps,
+        'expanded': result.expanded,
+        'generate_time': t1 - t0,
+        'grid_time': t2 - t1,
+        'solve_time': t3 - t2,
+    }
+    if keep_grid: record['cells'] = bytes(grid.cells)
+    return record
+
+
+def run_pipeline(count, width, height, seed=0, workers=None,
+                 heuristic='manhattan', keep_grid=False):
+    """
+        pre: count mazes of width by height are wanted, seed is the seed of the
+             first one.  workers defaults to the number of CPUs.
+        post: yields the result dict of every maze (see generate_and_solve) in
+              the order they complete.  At most a few tasks per worker are in
+              flight at once, so memory stays flat for very long runs.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers*4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        k = 0
+        while k < count or pending:
+            while k < count and len(pending) < window:
+                pending.add(pool.submit(generate_and_solve, seed + k, width,
+                                        height, heuristic, keep_grid))
+                k += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--width', type=int, default=80)
+    parser.add_argument('--height', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--heuristic', default='manhattan')
+    parser.add_argument('--out', default=None,
+                        help='file to write JSON lines to, default stdout')
+    args = parser.parse_args(argv)
+
+    out = open(args.out, 'w') if args.out else sys.stdout
+    try:
+        for record in run_pipeline(args.count, args.width, args.height,
+                                   args.seed, args.workers, args.heuristic):
+            print(json.dumps(record), file=out, flush=True)
+    finally:
+        if out is not sys.stdout: out.close()
+
+
+if __name__ == '__main__':
+    main()
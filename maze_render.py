@@ -0,0 +1,256 @@
+"""
+    Rasterizing WeightedGrid mazes into pixel buffers.
+
+    A maze is turned into an image with one pixel per location.  The colors are
+    filled in a whole channel at a time: the 0/1 cells are translated into the
+    red, green and blue values of walls and floor and interleaved into an RGB
+    buffer with slice assignment, so there is no Python loop over locations.
+
+    Nothing in here imports tkinter.  The Tk driver loads the PPM image from
+    ppm_image() into a PhotoImage once and scales that, instead of drawing a
+    rectangle per location.
+
+    png_image() writes indexed color PNGs with nothing but zlib, for batch
+    runs and mazes too big to look at in a window.  The cells are already
+    palette indexes (FLOOR_INDEX is 0, WALL_INDEX is 1), so a full size image
+    is the cells plus a filter byte per row.  Mazes bigger than max_size are
+    shrunk: every block of step by step locations becomes one pixel shaded by
+    the share of walls in it, counted by adding strided slices of the rows as
+    big integers, one byte per pixel.  Blocks larger than 15 by 15 are
+    sampled on a grid of 15 by 15 locations so the counts fit in a byte.
+    Small mazes are blown up by an integer scale with slice assignment.
+    Paths are drawn a run at a time, also with slice assignment.
+
+        with open('maze.png', 'wb') as f:
+            f.write(png_image(grid, start, goal, result.compact, max_size=1000))
+"""
+import struct
+import zlib
+from math import inf
+
+# colors used by the Tk driver
+FLOOR = (0x11, 0x11, 0x11)
+WALL = (0xdd, 0xdd, 0xdd)
+START = (0xff, 0x00, 0x00)
+GOAL = (0x00, 0x00, 0xff)
+PATH = (0x99, 0xff, 0x44)
+EXPLORED = (0x33, 0x44, 0x66)
+
+
+def rgb_pixels(grid, start=None, goal=None, floor=FLOOR, wall=WALL, explored=()):
+    """
+        pre: grid is a WeightedGrid, start and goal optional (x,y) locations,
+             explored an optional iterable of (x,y) locations a search expanded
+        post: returns a bytearray of width*height RGB pixels, row major, with
+              walls, floor, explored locations, start and goal colored.
+    """
+    cells = bytes(grid.cells)
+    pixels = bytearray(3*len(cells))
+    for channel in range(3):
+        table = bytes([floor[channel], wall[channel]]) + bytes(254)
+        pixels[channel::3] = cells.translate(table)
+    color = bytes(EXPLORED)
+    for x, y in explored:
+        i = 3*(y*grid.width + x)
+        pixels[i:i+3] = color
+    for p, color in ((start, START), (goal, GOAL)):
+        if p is not None:
+            i = 3*(p[1]*grid.width + p[0])
+            pixels[i:i+3] = bytes(color)
+    return pixels
+
+
+def ppm_image(grid, start=None, goal=None, explored=()):
+    """
+        pre: grid is a WeightedGrid, start and goal optional (x,y) locations,
+             explored an optional iterable of (x,y) locations a search expanded
+        post: returns the maze as a binary PPM (P6) image, one pixel per
+              location, ready for tk.PhotoImage(data=..., format='PPM').
+    """
+    header = b'P6 %d %d 255\n' % (grid.width, grid.height)
+    return header + bytes(rgb_pixels(grid, start, goal, explored=explored))
+
+
+# palette indexes of png_image().  Cells are 0 for floor and 1 for walls, so
+# they can be used as indexes as they are.
+FLOOR_INDEX, WALL_INDEX, EXPLORED_INDEX, PATH_INDEX, START_INDEX, GOAL_INDEX = range(6)
+
+# heat maps use HEAT_LEVELS colors from cold (blue) to hot (red), shrunk
+# mazes SHADES grays from floor to wall.
+HEAT_LEVELS = 32
+HEAT_INDEX = 6
+SHADES = 16
+SHADE_INDEX = HEAT_INDEX + HEAT_LEVELS
+
+# the most samples per side of a block, so a block holds at most 225 walls.
+_MAX_SAMPLES = 15
+
+
+def _palette():
+    """
+        post: returns the PLTE data of png_image(), RGB triples in index order
+    """
+    colors = [FLOOR, WALL, EXPLORED, PATH, START, GOAL]
+    for k in range(HEAT_LEVELS):
+        t = k / (HEAT_LEVELS - 1)
+        colors.append((round(255*t), round(160*(1 - abs(2*t - 1))), round(255*(1 - t))))
+    for k in range(SHADES):
+        t = k / (SHADES - 1)
+        colors.append(tuple(round(a + (b - a)*t) for a, b in zip(FLOOR, WALL)))
+    return b''.join(bytes(c) for c in colors)
+
+
+PALETTE = _palette()
+
+# cells byte -> palette index, anything not 0 is a wall.
+_CELL_TABLE = bytes([FLOOR_INDEX]) + bytes([WALL_INDEX])*255
+
+
+def _shaded(cells, w, h, step):
+    """
+        pre: step > 1
+        post: returns the pixels of the maze shrunk by step, one SHADES gray
+              per block of step by step locations.
+    """
+    ow, oh = -(-w // step), -(-h // step)
+    offsets = range(0, step, -(-step // _MAX_SAMPLES))
+    samples = len(offsets)**2
+    table = bytes(SHADE_INDEX + (count*(SHADES - 1) + samples//2)//samples
+                  if count <= samples else SHADE_INDEX + SHADES - 1
+                  for count in range(256))
+    pixels = bytearray(ow*oh)
+    for oy in range(oh):
+        # every lane of total is the wall count of one block, lanes never
+        # carry into each other as a count stays below 256.
+        total = 0
+        for dy in offsets:
+            y = oy*step + dy
+            if y >= h: break
+            row = cells[y*w:(y + 1)*w]
+            for dx in offsets:
+                total += int.from_bytes(row[dx::step], 'little')
+        pixels[oy*ow:(oy + 1)*ow] = total.to_bytes(ow, 'little').translate(table)
+    return pixels
+
+
+def _draw_heat(pixels, heat, w, h, step, ow):
+    """
+        post: the open pixels are colored by heat, sampled at the top left
+              location of every block.  Values that are inf or None are left
+              alone.
+    """
+    rows = [heat[y*w:(y + 1)*w:step] for y in range(0, h, step)]
+    found = [v for row in rows for v in row if v is not None and v != inf]
+    if not found: return
+    low, high = min(found), max(found)
+    scale = (HEAT_LEVELS - 1) / (high - low) if high > low else 0
+    walls = (WALL_INDEX, SHADE_INDEX + SHADES - 1)
+    for oy, row in enumerate(rows):
+        base = oy*ow
+        for ox, v in enumerate(row):
+            if v is None or v == inf or pixels[base + ox] in walls: continue
+            pixels[base + ox] = HEAT_INDEX + int((v - low)*scale)
+
+
+def _draw_path(pixels, path, step, ow):
+    """
+        pre: path is a CompactPath or a list of (x,y) locations
+        post: the path is drawn in PATH_INDEX a run of moves at a time
+    """
+    from astar_solver import CompactPath
+    if not isinstance(path, CompactPath):
+        if not path: return
+        path = CompactPath.from_path(path)
+    color = PATH_INDEX
+    x, y = path.start
+    pixels[(y//step)*ow + x//step] = color
+    for (dx, dy), count in path.runs():
+        nx, ny = x + dx*count, y + dy*count
+        if dy == 0:
+            a, b = sorted((x//step, nx//step))
+            i = (y//step)*ow
+            pixels[i + a:i + b + 1] = bytes([color])*(b - a + 1)
+        else:
+            a, b = sorted((y//step, ny//step))
+            i = x//step
+            pixels[a*ow + i:b*ow + i + 1:ow] = bytes([color])*(b - a + 1)
+        x, y = nx, ny
+
+
+def palette_pixels(grid, start=None, goal=None, path=None, explored=(),
+                   heat=None, step=1):
+    """
+        pre: grid is a WeightedGrid, start and goal optional (x,y) locations,
+             path an optional CompactPath or list of (x,y) locations, explored
+             an optional iterable of (x,y) locations a search expanded and
+             heat an optional sequence of one number per location (a
+             FlowField's dist, distances() from heuristics.py, visit counts)
+             to color the floor by.  step shrinks the maze, see png_image().
+        post: returns (pixels, width, height), pixels being a bytearray of
+              palette indexes, row major.
+    """
+    w, h = grid.width, grid.height
+    cells = bytes(grid.cells)
+    if step == 1:
+        pixels = bytearray(cells.translate(_CELL_TABLE))
+    else:
+        pixels = _shaded(cells, w, h, step)
+    ow, oh = -(-w // step), -(-h // step)
+    if heat is not None: _draw_heat(pixels, heat, w, h, step, ow)
+    for x, y in explored:
+        pixels[(y//step)*ow + x//step] = EXPLORED_INDEX
+    if path is not None: _draw_path(pixels, path, step, ow)
+    for p, color in ((start, START_INDEX), (goal, GOAL_INDEX)):
+        if p is not None: pixels[(p[1]//step)*ow + p[0]//step] = color
+    return pixels, ow, oh
+
+
+def _chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def png_image(grid, start=None, goal=None, path=None, explored=(), heat=None,
+              scale=1, max_size=None, level=6):
+    """
+        pre: grid, start, goal, path, explored and heat as for
+             palette_pixels().  scale is a whole number of pixels per
+             location.  max_size, if given, bounds the width and height of
+             the image in pixels: a bigger maze is shrunk by the smallest
+             whole step that fits, and scale is ignored.  level is the zlib
+             compression level.  The image is compressed with the run-length
+             strategy of zlib, which suits mazes: it is nearly as small as the
+             default strategy and takes a tenth of the time at level 6.
+        post: returns the maze as an 8 bit indexed color PNG image
+    """
+    step = 1
+    if max_size is not None:
+        longest = max(grid.width, grid.height)
+        if longest > max_size:
+            step, scale = -(-longest // max_size), 1
+    pixels, w, h = palette_pixels(grid, start, goal, path, explored, heat, step)
+    stride = w*scale + 1
+    raw = bytearray(stride*h*scale)
+    for y in range(h):
+        row = pixels[y*w:(y + 1)*w]
+        if scale > 1:
+            wide = bytearray(w*scale)
+            for k in range(scale): wide[k::scale] = row
+            row = wide
+        # each row is preceded by its filter type, 0 (none).
+        for k in range(scale):
+            i = (y*scale + k)*stride + 1
+            raw[i:i + stride - 1] = row
+    header = struct.pack('>IIBBBBB', w*scale, h*scale, 8, 3, 0, 0, 0)
+    compress = zlib.compressobj(level, zlib.DEFLATED, 15, 9, zlib.Z_RLE)
+    data = compress.compress(raw) + compress.flush()
+    return (b'\x89PNG\r\n\x1a\n' + _chunk(b'IHDR', header) + _chunk(b'PLTE', PALETTE)
+            + _chunk(b'IDAT', data) + _chunk(b'IEND', b''))
+
+
+def write_png(filename, grid, **options):
+    """
+        post: png_image(grid, **options) is written to filename
+    """
+    with open(filename, 'wb') as f:
+        f.write(png_image(grid, **options))
@@ -0,0 +1,530 @@
+"""
+    Local asyncio service answering path queries over HTTP.
+
+    Mazes are loaded once into shared memory (multiprocessing.shared_memory)
+    in the layout of WeightedGrid: the float64 weight layer, if any, then one
+    byte per location.  Worker processes attach to the block by name and wrap
+    it in a WeightedGrid without copying, so a maze is never pickled per
+    query.
+
+    Queries for the same maze that arrive within batch_delay of each other
+    are coalesced into one batch and solved together with
+    maze_index.solve_batch() in a ProcessPoolExecutor, so the event loop only
+    parses requests and writes responses.  Each worker keeps the grids and
+    MazeIndexes of the mazes it has seen.
+
+    Backpressure: once max_pending queries are queued or being solved, new
+    ones are answered 503 at once rather than queued.  A query not answered
+    within timeout seconds is answered 504.
+
+    Endpoints, all answering JSON:
+
+        POST   /mazes         {"file": path} or {"width", "height", "seed"},
+                              generated in the pool, at most max_locations
+        GET    /mazes         the loaded mazes
+        DELETE /mazes/ID      unload a maze
+        GET    /solve?maze=ID&start=X,Y&goal=X,Y
+        POST   /solve         {"maze": ID, "start": [x, y], "goal": [x, y]}
+        GET    /stats         counters, queue depth and latency percentiles
+
+    The server listens on TCP or on a Unix socket, and everything can be
+    exercised on localhost:
+
+        python maze_server.py --port 8080
+        curl -d '{"width": 201, "height": 101, "seed": 1}' localhost:8080/mazes
+        curl 'localhost:8080/solve?maze=m1&start=1,0&goal=199,100'
+        curl localhost:8080/stats
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from urllib.parse import parse_qs, urlsplit
+from weighted_grid import WeightedGrid
+
+# mazes kept attached by each worker process.
+_WORKER_MAZES = 8
+_worker_cache = OrderedDict()
+
+
+def _attach(name, width, height, weighted):
+    """
+        Runs in a worker.  post: returns (grid, index) for the shared maze
+        name, attaching to it the first time.
+    """
+    from maze_index import MazeIndex
+    entry = _worker_cache.get(name)
+    if entry is None:
+        shm = shared_memory.SharedMemory(name=name)
+        n = width*height
+        buf = shm.buf
+        weights = buf[:8*n].cast('d') if weighted else None
+        offset = 8*n if weighted else 0
+        grid = WeightedGrid(width, height, buf[offset:offset + n], weights)
+        entry = _worker_cache[name] = (shm, grid, MazeIndex(grid))
+        while len(_worker_cache) > _WORKER_MAZES:
+            old = _worker_cache.popitem(last=False)[1]
+            # the memoryviews must go before the block can be closed.
+            old[1].cells = old[1].weights = None
+            old[0].close()
+    _worker_cache.move_to_end(name)
+    return entry[1], entry[2]
+
+
+def _generate(width, height, seed):
+    """
+        Runs in a worker.  post: returns (cells, width, height, start, goal,
+        seed) of a new fast mode maze, cells as bytes.
+    """
+    from maze_generator import maze_generator
+    mg = maze_generator(width, height, fast=True, seed=seed)
+    grid = WeightedGrid.from_maze(mg.display(), mg.width, mg.height)
+    return bytes(grid.cells), mg.width, mg.height, mg.start, mg.goal, mg.seed
+
+
+def _solve_batch(name, width, height, weighted, queries, heuristic):
+    """
+        Runs in a worker.  post: returns [(path, cost, expanded), ...] for
+        the (start, goal) queries on the shared maze name.
+    """
+    from maze_index import solve_batch
+    grid, index = _attach(name, width, height, weighted)
+    return [(r.path, r.cost, r.expanded)
+            for r in solve_batch(grid, queries, index, heuristic)]
+
+
+class SharedMaze:
+    """
+        A maze loaded into a shared memory block.
+    """
+    def __init__(self, grid, start=None, goal=None, seed=None):
+        n = grid.width*grid.height
+        self.width, self.height = grid.width, grid.height
+        self.weighted = grid.weights is not None
+        self.start, self.goal, self.seed = start, goal, seed
+        size = (8*n if self.weighted else 0) + n
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        offset = 0
+        if self.weighted:
+            self.shm.buf[:8*n] = array('d', grid.weights).tobytes()
+            offset = 8*n
+        self.shm.buf[offset:offset + n] = bytes(grid.cells)
+        self.name = self.shm.name
+
+    def describe(self, maze_id):
+        return {'id': maze_id, 'width': self.width, 'height': self.height,
+                'weighted': self.weighted, 'start': self.start,
+                'goal': self.goal, 'seed': self.seed}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+            405: 'Method Not Allowed', 500: 'Internal Server Error',
+            503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class MazeServer:
+    """
+        The service.  Counters are reported by stats().
+    """
+    def __init__(self, workers=None, max_pending=1024, timeout=5.0,
+                 batch_delay=0.002, max_batch=256, heuristic='alt',
+                 history=10000, max_locations=4096*4096):
+        """
+            pre: workers defaults to the number of CPUs.  max_pending bounds
+                 the queries queued or being solved, timeout is in seconds,
+                 batch_delay is how long the first query of a batch waits for
+                 others and max_batch the most queries in one batch.
+                 history is how many latencies the percentiles are taken
+                 over.  max_locations bounds the size of the mazes generated
+                 by POST /mazes.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.heuristic = heuristic
+        self.max_locations = max_locations
+        self.mazes = {}
+        self._next_id = 1
+        self._pool = None
+        self._queues = {}       # maze id -> [(start, goal, future), ...]
+        self._timers = {}       # maze id -> flush TimerHandle
+        self._servers = []
+        # batches being solved, referenced until they finish.
+        self._tasks = set()
+        self.pending = 0
+        self.running = 0
+        self.requests = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_queries = 0
+        self.latencies = deque(maxlen=history)
+
+    # -- mazes -------------------------------------------------------------
+
+    def load(self, grid, start=None, goal=None, seed=None):
+        """
+            post: grid is copied into shared memory, returns its maze id
+        """
+        maze_id = f'm{self._next_id}'
+        self._next_id += 1
+        self.mazes[maze_id] = SharedMaze(grid, start, goal, seed)
+        return maze_id
+
+    def unload(self, maze_id):
+        maze = self.mazes.pop(maze_id, None)
+        if maze is None: raise HTTPError(404, f'no maze {maze_id}')
+        maze.close()
+
+    async def _load_request(self, body):
+        """
+            post: the maze file named in body is loaded, or a maze of the
+                  width and height in body is generated in the worker pool so
+                  queries keep being answered meanwhile.  Returns its maze id.
+        """
+        if 'file' in body:
+            import maze_file
+            try:
+                grid, header = maze_file.load_maze(body['file'])
+            except (OSError, ValueError) as e:
+                raise HTTPError(400, str(e))
+            maze_id = self.load(grid, header.start, header.goal, header.seed)
+            if isinstance(grid.cells, memoryview): grid.cells.release()
+            return maze_id
+        try:
+            width, height = int(body['width']), int(body['height'])
+            seed = body.get('seed')
+            if seed is not None: seed = int(seed)
+        except (KeyError, TypeError, ValueError):
+            raise HTTPError(400, 'expected "file" or "width" and "height"')
+        if width < 3 or height < 3:
+            raise HTTPError(400, 'width and height must be at least 3')
+        if width*height > self.max_locations:
+            raise HTTPError(400, f'mazes are limited to {self.max_locations} locations')
+        try:
+            cells, width, height, start, goal, seed = await asyncio.get_running_loop(
+                ).run_in_executor(self._pool, _generate, width, height, seed)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        grid = WeightedGrid.from_bytes(cells, width, height)
+        return self.load(grid, start, goal, seed)
+
+    # -- solving -----------------------------------------------------------
+
+    async def solve(self, maze_id, start, goal):
+        """
+            post: returns {'path', 'cost', 'expanded'} for the query, raises
+                  HTTPError 503 when too many queries are pending and 504
+                  when it isn't answered within timeout.
+        """
+        maze = self.mazes.get(maze_id)
+        if maze is None: raise HTTPError(404, f'no maze {maze_id}')
+        for x, y in (start, goal):
+            if not (0 <= x < maze.width and 0 <= y < maze.height):
+                raise HTTPError(400, f'({x},{y}) is not on the maze')
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPError(503, 'too many pending queries')
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues.setdefault(maze_id, [])
+        queue.append((start, goal, future))
+        self.pending += 1
+        if len(queue) >= self.max_batch: self._flush(maze_id)
+        elif maze_id not in self._timers:
+            self._timers[maze_id] = loop.call_later(self.batch_delay, self._flush, maze_id)
+        try:
+            path, cost, expanded = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HTTPError(504, 'query timed out')
+        return {'path': path, 'cost': cost, 'expanded': expanded}
+
+    def _flush(self, maze_id):
+        """
+            post: the queued queries of maze_id are sent to the pool as one
+                  batch.
+        """
+        timer = self._timers.pop(maze_id, None)
+        if timer is not None: timer.cancel()
+        batch = self._queues.pop(maze_id, [])
+        if not batch: return
+        task = asyncio.get_running_loop().create_task(self._run_batch(maze_id, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, maze_id, batch):
+        maze = self.mazes.get(maze_id)
+        self.running += len(batch)
+        self.batches += 1
+        self.batched_queries += len(batch)
+        try:
+            if maze is None: raise HTTPError(404, f'no maze {maze_id}')
+            queries = [(start, goal) for start, goal, _ in batch]
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._pool, _solve_batch, maze.name, maze.width, maze.height,
+                maze.weighted, queries, self.heuristic)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done(): future.set_result(result)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done(): future.set_exception(e)
+        finally:
+            self.running -= len(batch)
+            self.pending -= len(batch)
+
+    def stats(self):
+        """
+            post: returns the counters, queue depth and latency percentiles
+                  in milliseconds as a dict.
+        """
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            if not ordered: return None
+            return round(1000*ordered[min(len(ordered) - 1, int(p*len(ordered)))], 3)
+
+        return {
+            'requests': self.requests,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'queue_depth': sum(len(q) for q in self._queues.values()),
+            'running': self.running,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'batches': self.batches,
+            'mean_batch': self.batched_queries / self.batches if self.batches else None,
+            'mazes': len(self.mazes),
+            'workers': self.workers,
+            'latency_ms': {'p50': percentile(0.50), 'p90': percentile(0.90),
+                           'p99': percentile(0.99),
+                           'max': round(1000*ordered[-1], 3) if ordered else None},
+        }
+
+    # -- HTTP --------------------------------------------------------------
+
+    async def _route(self, method, target, body):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split('/') if p]
+        if parts == ['solve']:
+            if method == 'GET':
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                try:
+                    maze_id = query['maze']
+                    start = tuple(int(v) for v in query['start'].split(','))
+                    goal = tuple(int(v) for v in query['goal'].split(','))
+                except (KeyError, ValueError):
+                    raise HTTPError(400, 'expected maze, start=x,y and goal=x,y')
+            elif method == 'POST':
+                request = _json(body)
+                try:
+                    maze_id = request['maze']
+                    start = tuple(int(v) for v in request['start'])
+                    goal = tuple(int(v) for v in request['goal'])
+                except (KeyError, TypeError, ValueError):
+                    raise HTTPError(400, 'expected maze, start and goal')
+            else:
+                raise HTTPError(405, 'use GET or POST')
+            if len(start) != 2 or len(goal) != 2:
+                raise HTTPError(400, 'start and goal are x,y pairs')
+            return await self.solve(maze_id, start, goal)
+        if parts == ['stats'] and method == 'GET':
+            return self.stats()
+        if parts == ['mazes']:
+            if method == 'GET':
+                return [maze.describe(k) for k, maze in self.mazes.items()]
+            if method == 'POST':
+                maze_id = await self._load_request(_json(body))
+                return self.mazes[maze_id].describe(maze_id)
+            raise HTTPError(405, 'use GET or POST')
+        if len(parts) == 2 and parts[0] == 'mazes':
+            if method == 'GET':
+                if parts[1] not in self.mazes: raise HTTPError(404, f'no maze {parts[1]}')
+                return self.mazes[parts[1]].describe(parts[1])
+            if method == 'DELETE':
+                self.unload(parts[1])
+                return {'unloaded': parts[1]}
+            raise HTTPError(405, 'use GET or DELETE')
+        raise HTTPError(404, f'no endpoint {url.path}')
+
+    async def _handle(self, reader, writer):
+        """
+            Serves the HTTP/1.1 requests of one connection.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    method, target, version = line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''): break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    length = _content_length(headers)
+                except HTTPError as e:
+                    # there is no telling where the body ends, so neither
+                    # can the next request be found.
+                    await self._send(writer, e.status, {'error': str(e)}, True)
+                    break
+                body = await reader.readexactly(length)
+
+                began = time.perf_counter()
+                solving = urlsplit(target).path.rstrip('/') == '/solve'
+                if solving: self.requests += 1
+                try:
+                    status, payload = 200, await self._route(method, target, body)
+                    if solving:
+                        self.completed += 1
+                        self.latencies.append(time.perf_counter() - began)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    self.errors += 1
+                    status, payload = 500, {'error': repr(e)}
+
+                close = (version == 'HTTP/1.0' or headers.get('connection', '').lower() == 'close')
+                await self._send(writer, status, payload, close)
+                if close: break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, status, payload, close):
+        """
+            post: the JSON response is written, saying Connection: close when
+                  close is set.
+        """
+        data = json.dumps(payload).encode()
+        head = [f'HTTP/1.1 {status} {_REASONS.get(status, "")}',
+                'Content-Type: application/json',
+                f'Content-Length: {len(data)}']
+        if status == 503: head.append('Retry-After: 1')
+        if close: head.append('Connection: close')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8080, path=None):
+        """
+            post: the worker pool is started and the server listens on
+                  host:port (port 0 picks a free one), or on the Unix socket
+                  path when given.  Returns the asyncio server.
+        """
+        if self._pool is None:
+            # forked workers would inherit the sockets of the connections open
+            # at the time, which then never see EOF when the server closes
+            # them, so workers are started from a clean process.
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        if path is not None:
+            server = await asyncio.start_unix_server(self._handle, path=path)
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+        self._servers.append(server)
+        return server
+
+    async def close(self):
+        """
+            post: the servers and worker pool are stopped and every maze is
+                  unloaded.
+        """
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+        for maze_id in list(self.mazes): self.unload(maze_id)
+
+
+def _content_length(headers):
+    """
+        post: returns the Content-Length of the request, 0 without one.
+              Raises HTTPError 400 when it isn't a whole number of bytes.
+    """
+    value = headers.get('content-length', '0')
+    if not (value.isascii() and value.isdigit()):
+        raise HTTPError(400, f'bad Content-Length {value!r}')
+    return int(value)
+
+
+def _json(body):
+    try:
+        request = json.loads(body or b'{}')
+    except ValueError:
+        raise HTTPError(400, 'body is not JSON')
+    if not isinstance(request, dict): raise HTTPError(400, 'expected a JSON object')
+    return request
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve maze path queries over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--unix', default=None, help='listen on this Unix socket instead')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-pending', type=int, default=1024)
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--batch-delay', type=float, default=0.002)
+    parser.add_argument('--heuristic', default='alt')
+    parser.add_argument('--max-locations', type=int, default=4096*4096,
+                        help='largest maze POST /mazes may generate')
+    parser.add_argument('maze', nargs='*', help='maze files to load at start')
+    args = parser.parse_args(argv)
+
+    async def run():
+        import maze_file
+        service = MazeServer(args.workers, args.max_pending, args.timeout,
+                             args.batch_delay, heuristic=args.heuristic,
+                             max_locations=args.max_locations)
+        for filename in args.maze:
+            grid, header = maze_file.load_maze(filename)
+            maze_id = service.load(grid, header.start, header.goal, header.seed)
+            print(f'{filename}: {maze_id}', flush=True)
+        server = await service.start(args.host, args.port, args.unix)
+        where = args.unix or '%s:%d' % server.sockets[0].getsockname()[:2]
+        print(f'listening on {where}', flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
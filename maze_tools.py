@@ -0,0 +1,261 @@
+"""
+    Headless library functions and command line for generating, solving and
+    benchmarking mazes.
+
+    Nothing here imports tkinter unless the gui command is used, so this
+    module works on machines without a display and starts quickly enough to
+    be run once per request.
+
+        python -m maze_tools generate --width 81 --height 41 --seed 7 -o maze.amz
+        python -m maze_tools solve maze.amz --format json
+        python -m maze_tools solve --width 81 --height 41 --seed 7
+        python -m maze_tools solve maze.amz --format png --max-size 1000 -o maze.png
+        python -m maze_tools bench --width 201 --height 101 --count 20
+        python -m maze_tools gui --width 80 --height 40 --animate
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+from array import array
+from maze_generator import maze_generator, stream_maze
+from weighted_grid import WeightedGrid
+from astar_solver import a_star_search
+from path_cache import PathCache
+from maze_render import png_image
+import maze_file
+
+
+def generate(width, height, seed=None, fast=True):
+    """
+        pre: width and height of the maze, optional seed.
+        post: returns a maze_generator holding the new maze.  start, goal and
+              seed are attributes of it, display() gives its rows.  Raises
+              ValueError for mazes smaller than 3 by 3.
+    """
+    if width < 3 or height < 3:
+        raise ValueError('mazes must be at least 3 by 3')
+    return maze_generator(width, height, fast=fast, seed=seed)
+
+
+def solve(maze, start=None, goal=None, heuristic='manhattan', cache=None):
+    """
+        pre: maze is a WeightedGrid, a maze_generator, or the filename of a
+             text or binary maze.  start and goal default to the ones stored
+             with the maze.  cache is an optional PathCache to answer the
+             query from.
+        post: returns (grid, start, goal, SearchResult).
+    """
+    if isinstance(maze, maze_generator):
+        start = start or maze.start
+        goal = goal or maze.goal
+        grid = WeightedGrid.from_maze(maze.display(), maze.width, maze.height)
+    elif isinstance(maze, WeightedGrid):
+        grid = maze
+    else:
+        grid, header = maze_file.load_maze(maze)
+        start = start or header.start
+        goal = goal or header.goal
+    if start is None or goal is None:
+        raise ValueError('start and goal are needed to solve this maze')
+    if cache is not None:
+        return grid, start, goal, cache.solve(grid, start, goal, heuristic)
+    return grid, start, goal, a_star_search(grid, start, goal, heuristic)
+
+
+def benchmark(width, height, count=10, seed=0, heuristic='manhattan'):
+    """
+        pre: count mazes of width by height, seeded seed, seed+1, ...
+        post: returns a dict of total and per maze generation and solve times,
+              nodes expanded and nodes expanded per second.
+    """
+    gen_time = solve_time = 0.0
+    expanded = 0
+    for k in range(count):
+        t0 = time.perf_counter()
+        mg = generate(width, height, seed + k)
+        t1 = time.perf_counter()
+        result = solve(mg, heuristic=heuristic)[3]
+        t2 = time.perf_counter()
+        gen_time += t1 - t0
+        solve_time += t2 - t1
+        expanded += result.expanded
+    return {
+        'width': width,
+        'height': height,
+        'count': count,
+        'seed': seed,
+        'heuristic': heuristic,
+        'generate_time': gen_time,
+        'solve_time': solve_time,
+        'expanded': expanded,
+        'nodes_per_second': expanded / solve_time if solve_time else None,
+    }
+
+
+def solution_rows(grid, path, start, goal):
+    """
+        post: returns the maze as text rows with the path drawn in '.', the
+              start as 'S' and the goal as 'G'.
+    """
+    w = grid.width
+    text = bytearray(bytes(grid.cells).translate(bytes.maketrans(b'\x00\x01', b' #')))
+    for x, y in path or ():
+        text[y*w + x] = ord('.')
+    text[start[1]*w + start[0]] = ord('S')
+    text[goal[1]*w + goal[0]] = ord('G')
+    return [text[i:i+w].decode('latin-1') for i in range(0, len(text), w)]
+
+
+def _point(text):
+    """ argparse type for x,y locations """
+    x, y = text.split(',')
+    return (int(x), int(y))
+
+
+def _open_output(name, binary=False):
+    """ opens the output file, or stdout (left open) when name is None or '-' """
+    if name in (None, '-'):
+        return contextlib.nullcontext(sys.stdout.buffer if binary else sys.stdout)
+    return open(name, 'wb' if binary else 'w')
+
+
+def _cmd_generate(args):
+    if args.width < 3 or args.height < 3:
+        args.parser.error('mazes must be at least 3 by 3')
+    if args.method == 'eller':
+        if args.output in (None, '-'):
+            raise SystemExit('eller mazes are streamed to a file, use -o')
+        if args.format == 'json':
+            # the rows are written as they are made, never held for a JSON
+            # document.
+            raise SystemExit('eller mazes are streamed as text or binary, not json')
+        start, goal, seed = stream_maze(args.output, args.width, args.height,
+                                        args.seed, binary=args.format == 'binary')
+        print(json.dumps({'start': start, 'goal': goal, 'seed': seed}), file=sys.stderr)
+        return
+
+    mg = generate(args.width, args.height, args.seed)
+    if args.format == 'binary':
+        if args.output in (None, '-'):
+            raise SystemExit('binary mazes are written to a file, use -o')
+        mg.write_binary(args.output)
+        return
+    with _open_output(args.output) as out:
+        if args.format == 'json':
+            json.dump({'width': mg.width, 'height': mg.height, 'seed': mg.seed,
+                       'start': mg.start, 'goal': mg.goal,
+                       'rows': mg.display()}, out)
+            out.write('\n')
+        else:
+            out.write('\n'.join(mg.display()) + '\n')
+
+
+def _cmd_solve(args):
+    cache = PathCache(filename=args.cache) if args.cache else None
+    try:
+        if args.maze is None:
+            maze = generate(args.width, args.height, args.seed)
+        else:
+            maze = args.maze
+        grid, start, goal, result = solve(maze, args.start, args.goal,
+                                          args.heuristic, cache)
+    except ValueError as e:
+        # text mazes carry no start and goal, heuristics and sizes are given
+        # by the user and so may be start and goal locations off the grid,
+        # so these are usage errors rather than crashes.
+        args.parser.error(str(e))
+    finally:
+        if cache is not None: cache.close()
+
+    if args.format == 'binary':
+        # the path as little-endian int32 x,y pairs
+        path = array('i', [c for p in result.path or () for c in p])
+        if sys.byteorder != 'little': path.byteswap()
+        with _open_output(args.output, binary=True) as out:
+            out.write(path.tobytes())
+        return
+    if args.format == 'png':
+        with _open_output(args.output, binary=True) as out:
+            out.write(png_image(grid, start, goal, result.compact,
+                                scale=args.scale, max_size=args.max_size))
+        return
+    with _open_output(args.output) as out:
+        if args.format == 'json':
+            json.dump({'start': start, 'goal': goal, 'cost': result.cost,
+                       'expanded': result.expanded, 'path': result.path}, out)
+            out.write('\n')
+        else:
+            out.write('\n'.join(solution_rows(grid, result.path, start, goal)) + '\n')
+            if result.path is None: out.write('the goal can not be reached\n')
+            else: out.write(f'steps to goal: {len(result.path)}\n')
+
+
+def _cmd_bench(args):
+    if args.width < 3 or args.height < 3:
+        args.parser.error('mazes must be at least 3 by 3')
+    print(json.dumps(benchmark(args.width, args.height, args.count, args.seed,
+                               args.heuristic)))
+
+
+def _cmd_gui(args):
+    # tkinter is only needed here, so it is only imported here.
+    from AStarMaze import AStarMaze
+    app = AStarMaze(args.width, args.height, animate=args.animate, seed=args.seed,
+                    show_search=args.show_search)
+    app.mainloop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m maze_tools',
+                                     description='Generate, solve and benchmark mazes.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def size(p):
+        p.add_argument('--width', type=int, default=80)
+        p.add_argument('--height', type=int, default=40)
+        p.add_argument('--seed', type=int, default=None)
+
+    p = sub.add_parser('generate', help='generate a maze')
+    size(p)
+    p.add_argument('--method', choices=('prim', 'eller'), default='prim')
+    p.add_argument('--format', choices=('text', 'json', 'binary'), default='text')
+    p.add_argument('-o', '--output', default=None)
+    p.set_defaults(func=_cmd_generate, parser=p)
+
+    p = sub.add_parser('solve', help='solve a maze file, or a generated maze')
+    p.add_argument('maze', nargs='?', default=None,
+                   help='text or binary maze file, omit to generate one')
+    size(p)
+    p.add_argument('--start', type=_point, default=None, help='x,y')
+    p.add_argument('--goal', type=_point, default=None, help='x,y')
+    p.add_argument('--heuristic', default='manhattan')
+    p.add_argument('--cache', default=None,
+                   help='sqlite file of solved paths to reuse and add to')
+    p.add_argument('--format', choices=('text', 'json', 'binary', 'png'), default='text')
+    p.add_argument('--scale', type=int, default=1, help='pixels per location of png images')
+    p.add_argument('--max-size', type=int, default=None,
+                   help='shrink png images to at most this many pixels a side')
+    p.add_argument('-o', '--output', default=None)
+    p.set_defaults(func=_cmd_solve, parser=p)
+
+    p = sub.add_parser('bench', help='time generation and solving')
+    size(p)
+    p.add_argument('--count', type=int, default=10)
+    p.add_argument('--heuristic', default='manhattan')
+    p.set_defaults(func=_cmd_bench, seed=0, parser=p)
+
+    p = sub.add_parser('gui', help='draw a maze and its solution with tkinter')
+    size(p)
+    p.add_argument('--animate', action='store_true')
+    p.add_argument('--show-search', action='store_true',
+                   help='also draw the locations A* expanded')
+    p.set_defaults(func=_cmd_gui)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
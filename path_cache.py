@@ -0,0 +1,240 @@
+"""
+    LRU cache of solved paths, keyed by the content of the maze.
+
+    A query is keyed by a fingerprint of the grid, a BLAKE2b digest of its
+    size, cells and weights, together with the start and goal.  The key
+    depends only on what the maze is, not on which WeightedGrid object holds
+    it, so the same maze loaded twice, or rebuilt from the same text, hits the
+    same entries.  The fingerprint of a grid is remembered until the grid is
+    edited, so a hit doesn't rehash the maze.
+
+    Paths are kept as the run-length moves of a CompactPath, a couple of
+    bytes per turn, and the cache is bounded by the bytes those take (plus a
+    fixed overhead per entry); the least recently used entries are evicted to
+    stay under max_bytes.  Editing a grid the
+    cache has seen drops its entries (the cache listens to the grid, see
+    WeightedGrid.add_listener).
+
+    With a filename the cache is backed by an sqlite database as well.  Memory
+    misses are looked up there and every solved query is written to it, so
+    results survive restarts and are shared between processes on a machine.
+    The database is keyed by content too, so its entries never go stale and it
+    is not trimmed; delete the file to empty it.
+
+        cache = PathCache(max_bytes=32*2**20, filename='paths.sqlite')
+        result = cache.solve(grid, start, goal)
+        print(cache.as_dict())
+"""
+import hashlib
+import struct
+import sys
+import weakref
+from array import array
+from collections import OrderedDict
+from astar_solver import CompactPath, SearchResult, a_star_search
+
+# bytes charged per entry on top of its path: the key, the result object and
+# the bookkeeping around them.
+ENTRY_OVERHEAD = 200
+
+
+def grid_fingerprint(grid):
+    """
+        pre: grid is a WeightedGrid
+        post: returns a 16 byte BLAKE2b digest of the grid's width, height,
+              cells and weights.  Grids with the same content have the same
+              fingerprint.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(struct.pack('<II', grid.width, grid.height))
+    digest.update(grid.cells)
+    if grid.weights is not None:
+        weights = grid.weights
+        if sys.byteorder != 'little':
+            weights = array('d', weights)
+            weights.byteswap()
+        digest.update(b'w')
+        digest.update(weights)
+    return digest.digest()
+
+
+def _moves(result):
+    """
+        post: returns the run-length moves of result's path as bytes, or None
+              when it has no path.
+    """
+    if result.compact is not None: return bytes(result.compact.moves)
+    if result.path is None: return None
+    return bytes(CompactPath.from_path(result.path).moves)
+
+
+class PathCache:
+    """
+        Bounded LRU cache of SearchResults in front of a_star_search().
+
+        hits, misses and evictions count lookups answered, lookups that had
+        to search, and entries dropped to make room.  disk_hits counts the
+        misses answered from the database, invalidations the entries dropped
+        because their grid was edited.  size is the bytes held in memory.
+    """
+    def __init__(self, max_bytes=64*2**20, filename=None):
+        """
+            pre: max_bytes bounds the memory used by cached paths, filename is
+                 an optional sqlite database to persist results in.
+            post: an empty cache is created, the database and its table are
+                  created if needed.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.invalidations = 0
+        # key -> (cost, moves, bytes charged), oldest first.
+        self._entries = OrderedDict()
+        # fingerprint -> keys of its entries, for invalidation.
+        self._by_fingerprint = {}
+        # grid -> (version, fingerprint) of the grids seen.
+        self._fingerprints = weakref.WeakKeyDictionary()
+        self._db = None
+        if filename is not None:
+            # only caches backed by a file need sqlite, so only they import it.
+            import sqlite3
+            self._db = sqlite3.connect(filename)
+            self._db.execute('CREATE TABLE IF NOT EXISTS compact_paths ('
+                             'fingerprint BLOB, sx INTEGER, sy INTEGER, '
+                             'gx INTEGER, gy INTEGER, cost REAL, moves BLOB, '
+                             'PRIMARY KEY (fingerprint, sx, sy, gx, gy))')
+            self._db.commit()
+
+    def close(self):
+        """
+            post: the database, if any, is closed.  The memory cache stays
+                  usable.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def fingerprint(self, grid):
+        """
+            post: returns grid_fingerprint(grid), hashing the grid only the
+                  first time it is seen and after it is edited.
+        """
+        seen = self._fingerprints.get(grid)
+        if seen is not None and seen[0] == grid.version: return seen[1]
+        if seen is None: grid.add_listener(self._on_change)
+        fp = grid_fingerprint(grid)
+        self._fingerprints[grid] = (grid.version, fp)
+        return fp
+
+    def _on_change(self, grid, changed):
+        """
+            Grid listener, drops the entries of the grid's old content.
+        """
+        seen = self._fingerprints.get(grid)
+        if seen is None: return
+        for key in self._by_fingerprint.pop(seen[1], ()):
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.size -= entry[2]
+                self.invalidations += 1
+
+    def get(self, grid, start, goal):
+        """
+            post: returns the cached SearchResult for the query (expanded is
+                  0), or None when it isn't cached.  Counts a hit or a miss.
+        """
+        key = (self.fingerprint(grid), tuple(start), tuple(goal))
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._result(key, entry[0], entry[1])
+        if self._db is not None:
+            row = self._db.execute(
+                'SELECT cost, moves FROM compact_paths WHERE fingerprint=? AND '
+                'sx=? AND sy=? AND gx=? AND gy=?', (key[0],) + key[1] + key[2]).fetchone()
+            if row is not None:
+                cost, moves = row
+                self._store(key, cost, moves)
+                self.hits += 1
+                self.disk_hits += 1
+                return self._result(key, cost, moves)
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _result(key, cost, moves):
+        if moves is None: return SearchResult(None, None, 0)
+        return SearchResult(CompactPath(key[1], moves), cost, 0)
+
+    def put(self, grid, start, goal, result):
+        """
+            pre: result is the SearchResult of the query on grid as it is now
+            post: the result is cached, in memory and in the database
+        """
+        key = (self.fingerprint(grid), tuple(start), tuple(goal))
+        moves = _moves(result)
+        self._store(key, result.cost, moves)
+        if self._db is not None:
+            self._db.execute('INSERT OR REPLACE INTO compact_paths VALUES (?,?,?,?,?,?,?)',
+                             (key[0],) + key[1] + key[2] + (result.cost, moves))
+            self._db.commit()
+
+    def _store(self, key, cost, moves):
+        """
+            post: key is the most recent memory entry, older entries are
+                  evicted until the cache fits max_bytes.
+        """
+        charge = ENTRY_OVERHEAD + (0 if moves is None else len(moves))
+        old = self._entries.pop(key, None)
+        if old is not None: self.size -= old[2]
+        if charge > self.max_bytes: return
+        self._entries[key] = (cost, moves, charge)
+        self._by_fingerprint.setdefault(key[0], set()).add(key)
+        self.size += charge
+        while self.size > self.max_bytes:
+            old_key, old = self._entries.popitem(last=False)
+            self._by_fingerprint.get(old_key[0], set()).discard(old_key)
+            self.size -= old[2]
+            self.evictions += 1
+
+    def solve(self, grid, start, goal, heuristic='manhattan', mode='astar'):
+        """
+            post: returns the SearchResult for the query from the cache, or
+                  searches with a_star_search() and caches the result.
+        """
+        result = self.get(grid, start, goal)
+        if result is None:
+            result = a_star_search(grid, start, goal, heuristic, mode=mode)
+            self.put(grid, start, goal, result)
+        return result
+
+    def clear(self):
+        """
+            post: the memory cache is emptied, the counters and the database
+                  are left alone.
+        """
+        self._entries.clear()
+        self._by_fingerprint.clear()
+        self.size = 0
+
+    def as_dict(self):
+        """
+            post: returns the counters, size and entry count as a dict
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'disk_hits': self.disk_hits,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'size': self.size,
+            'max_bytes': self.max_bytes,
+        }
+
+    def __repr__(self):
+        return 'PathCache(' + ', '.join(f'{k}={v}' for k, v in self.as_dict().items()) + ')'
@@ -0,0 +1,151 @@
+"""
+    Regression tests for a_star_search(): every search mode must find paths
+    as cheap as the exact distances of heuristics.distances().
+
+        python -m unittest test_astar_solver
+"""
+import os
+import random
+import unittest
+from math import inf
+from astar_solver import SEARCH_MODES, SearchStats, a_star_search
+from heuristics import distances
+from maze_generator import maze_generator
+from weighted_grid import WeightedGrid
+
+
+def random_grid(rng, weighted):
+    """
+        post: returns a small grid with random walls and, if weighted,
+              weights of 1, 2 or 5.
+    """
+    w, h = rng.randint(4, 14), rng.randint(4, 14)
+    grid = WeightedGrid(w, h)
+    for i in range(w*h): grid.cells[i] = rng.random() < 0.25
+    if weighted:
+        for i in range(w*h): grid.set_weight((i % w, i // w), rng.choice((1, 2, 5)))
+    return grid
+
+
+class TestSearchCosts(unittest.TestCase):
+
+    def check(self, weighted, heuristics, modes=SEARCH_MODES, trials=300):
+        rng = random.Random(0)
+        for _ in range(trials):
+            grid = random_grid(rng, weighted)
+            w = grid.width
+            open_cells = [i for i, c in enumerate(grid.cells) if not c]
+            if len(open_cells) < 2: continue
+            s, t = rng.sample(open_cells, 2)
+            start, goal = (s % w, s // w), (t % w, t // w)
+            exact = distances(grid, s)[t]
+            expected = None if exact == inf else exact
+            for heuristic in heuristics:
+                for mode in modes:
+                    for stats in (None, SearchStats()):
+                        result = a_star_search(grid, start, goal, heuristic,
+                                               stats=stats, mode=mode)
+                        self.assertEqual(result.cost, expected,
+                                         (w, grid.height, start, goal, heuristic, mode))
+
+    def test_uniform(self):
+        self.check(False, ('manhattan', 'alt'))
+
+    def test_weighted_bidirectional(self):
+        # the backward side must bound costs from the start, which differ
+        # from the costs to it on weighted grids.
+        self.check(True, ('alt', 'manhattan', 'octile', 'euclidean', 'zero'),
+                   modes=('bidirectional',))
+
+    def test_weighted(self):
+        self.check(True, ('manhattan', 'alt'), modes=('astar', 'jps'))
+
+
+class TestExpansions(unittest.TestCase):
+
+    def test_open_grid_ties(self):
+        # manhattan is exact on an open grid, so with ties broken toward
+        # larger costs only the locations of one path are expanded.
+        grid = WeightedGrid(300, 300)
+        for mode in SEARCH_MODES:
+            result = a_star_search(grid, (0, 0), (299, 299), mode=mode)
+            self.assertEqual(result.cost, 598)
+            self.assertLessEqual(result.expanded, 600, mode)
+
+    def expansions(self, grid, queries):
+        # total expansions of the astar and bidirectional modes
+        return [sum(a_star_search(grid, start, goal, mode=mode).expanded
+                    for start, goal in queries)
+                for mode in ('astar', 'bidirectional')]
+
+    def random_queries(self, grid, rng, count):
+        w = grid.width
+        cells = [i for i, wall in enumerate(grid.cells) if not wall]
+        queries = []
+        for _ in range(count):
+            a, b = rng.sample(cells, 2)
+            queries.append(((a % w, a // w), (b % w, b // w)))
+        return queries
+
+    def test_bidirectional_cool_maze(self):
+        # the forward side of (11,1) to (39,39) is walled into a pocket, so
+        # that query alone expands more than astar (894 against 680); going
+        # back (907 against 1270) and on random queries it expands fewer.
+        with open(os.path.join(os.path.dirname(__file__), 'cool_maze.txt')) as f:
+            grid = WeightedGrid.from_maze(f.read().splitlines())
+        astar, bidirectional = self.expansions(grid, [((11, 1), (39, 39)), ((39, 39), (11, 1))])
+        self.assertLess(bidirectional, astar)
+        astar, bidirectional = self.expansions(grid, self.random_queries(grid, random.Random(0), 100))
+        self.assertLess(bidirectional, 0.95*astar)
+
+    def test_bidirectional_prim_maze(self):
+        mg = maze_generator(101, 101, fast=True, seed=0)
+        grid = WeightedGrid.from_maze(mg.display(), mg.width, mg.height)
+        astar, bidirectional = self.expansions(grid, self.random_queries(grid, random.Random(0), 50))
+        self.assertLess(bidirectional, 0.9*astar)
+
+    def test_instrumented_order(self):
+        # the instrumented loop must expand in the same order as the plain one.
+        rng = random.Random(1)
+        for _ in range(100):
+            grid = random_grid(rng, rng.random() < 0.5)
+            w = grid.width
+            open_cells = [i for i, c in enumerate(grid.cells) if not c]
+            if len(open_cells) < 2: continue
+            s, t = rng.sample(open_cells, 2)
+            start, goal = (s % w, s // w), (t % w, t // w)
+            plain = a_star_search(grid, start, goal)
+            seen = []
+            stats = SearchStats()
+            counted = a_star_search(grid, start, goal, stats=stats,
+                                    on_expand=lambda p, c: seen.append(p))
+            self.assertEqual(plain.path, counted.path)
+            self.assertEqual(plain.expanded, counted.expanded)
+            self.assertEqual(len(seen), counted.expanded)
+
+
+class TestMinWeight(unittest.TestCase):
+
+    def test_edits(self):
+        # the heuristics scale by min_weight(), which is kept between edits.
+        rng = random.Random(3)
+        grid = WeightedGrid(6, 5)
+        self.assertEqual(grid.min_weight(), 1)
+        for _ in range(500):
+            grid.set_weight((rng.randrange(6), rng.randrange(5)), rng.choice((0.5, 1, 2, 3, 7)))
+            self.assertEqual(grid.min_weight(), min(grid.weights))
+
+
+class TestArguments(unittest.TestCase):
+
+    def test_off_grid(self):
+        grid = WeightedGrid(5, 4)
+        for p in ((-1, 0), (5, 0), (0, 4), (0, -1), (9, 9)):
+            with self.assertRaises(ValueError):
+                a_star_search(grid, p, (1, 1))
+            with self.assertRaises(ValueError):
+                a_star_search(grid, (1, 1), p)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+    Regression tests for ComponentIndex: the labels kept up to date through
+    wall edits must split the grid into the same regions as labelling it
+    again from scratch.
+
+        python -m unittest test_components
+"""
+import random
+import unittest
+from components import ComponentIndex, components_for
+from test_astar_solver import random_grid
+from weighted_grid import WeightedGrid
+
+
+def regions(index):
+    """
+        post: returns the labels of index renumbered in order of first
+              appearance, so two labellings of the same regions are equal.
+    """
+    names = {-1: -1}
+    return [names.setdefault(label, len(names) - 1) for label in index.labels]
+
+
+class TestEdits(unittest.TestCase):
+
+    def check(self, index, grid):
+        fresh = ComponentIndex(grid, listen=False)
+        self.assertEqual(regions(index), regions(fresh))
+        self.assertEqual(index.count, fresh.count)
+        self.assertEqual(sorted(index.sizes.values()), sorted(fresh.sizes.values()))
+
+    def test_random_edits(self):
+        rng = random.Random(18)
+        for _ in range(60):
+            grid = random_grid(rng, False)
+            w, h = grid.width, grid.height
+            index = ComponentIndex(grid)
+            self.check(index, grid)
+            for _ in range(40):
+                p = (rng.randrange(w), rng.randrange(h))
+                if rng.random() < 0.5: grid.add_wall(p)
+                else: grid.remove_wall(p)
+                self.check(index, grid)
+            index.close()
+
+    def test_splits(self):
+        # a wall across a corridor splits it, opening it again joins it.
+        grid = WeightedGrid.from_maze(['#####', '     ', '#####'])
+        index = components_for(grid)
+        self.assertTrue(index.connected((0, 1), (4, 1)))
+        grid.add_wall((2, 1))
+        self.assertFalse(index.connected((0, 1), (4, 1)))
+        self.assertEqual((index.count, index.size((0, 1)), index.size((2, 1))), (2, 2, 0))
+        grid.remove_wall((2, 1))
+        self.assertTrue(index.connected((0, 1), (4, 1)))
+        self.assertEqual(index.size((4, 1)), 5)
+        self.assertIs(components_for(grid), index)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+    Regression tests for DStarLite: after every edit and every step of the
+    agent, the repaired plan must cost as much as a fresh a_star_search().
+
+        python -m unittest test_dstar_lite
+"""
+import random
+import unittest
+from astar_solver import a_star_search
+from dstar_lite import DStarLite
+from test_astar_solver import random_grid
+from weighted_grid import WeightedGrid
+
+
+def path_cost(grid, path):
+    """
+        post: returns the cost of walking path, None if it isn't a walk of
+              open neighboring locations.
+    """
+    cost = 0
+    for (x, y), (nx, ny) in zip(path, path[1:]):
+        if abs(x - nx) + abs(y - ny) != 1 or grid.cells[ny*grid.width + nx]: return None
+        cost += grid.weight((nx, ny))
+    return cost
+
+
+class TestReplanning(unittest.TestCase):
+
+    def check(self, weighted, trials=60, edits=25):
+        rng = random.Random(15 + weighted)
+        for _ in range(trials):
+            grid = random_grid(rng, weighted)
+            w, h = grid.width, grid.height
+            start = (rng.randrange(w), rng.randrange(h))
+            goal = (rng.randrange(w), rng.randrange(h))
+            grid.remove_wall(start)
+            grid.remove_wall(goal)
+            planner = DStarLite(grid, start, goal)
+            for _ in range(edits):
+                p = (rng.randrange(w), rng.randrange(h))
+                roll = rng.random()
+                if p in (planner.start, goal): pass
+                elif roll < 0.4: grid.add_wall(p)
+                elif roll < 0.8: grid.remove_wall(p)
+                elif weighted: grid.set_weight(p, rng.choice((1, 2, 5)))
+                result = planner.plan()
+                fresh = a_star_search(grid, planner.start, goal)
+                self.assertEqual(result.cost, fresh.cost)
+                if result.path is None: continue
+                self.assertEqual(result.path[0], planner.start)
+                self.assertEqual(result.path[-1], goal)
+                self.assertEqual(path_cost(grid, result.path), result.cost)
+                if len(result.path) > 1 and rng.random() < 0.5:
+                    planner.move_to(result.path[1])
+            planner.close()
+
+    def test_uniform(self):
+        self.check(False)
+
+    def test_weighted(self):
+        self.check(True)
+
+
+class TestArguments(unittest.TestCase):
+
+    def test_alt_refused(self):
+        with self.assertRaises(ValueError):
+            DStarLite(WeightedGrid(4, 4), (0, 0), (3, 3), heuristic='alt')
+
+
+if __name__ == '__main__':
+    unittest.main()
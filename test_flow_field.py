@@ -0,0 +1,75 @@
+"""
+    Regression tests for FlowField: the field repaired after every edit must
+    hold the same costs as a field built from scratch, and its moves must
+    follow cheapest paths.
+
+        python -m unittest test_flow_field
+"""
+import random
+import unittest
+from math import inf
+from astar_solver import a_star_search
+from flow_field import FlowField
+from test_astar_solver import random_grid
+
+
+class TestEdits(unittest.TestCase):
+
+    def check(self, field, grid):
+        fresh = FlowField(grid, field.goal, listen=False)
+        self.assertEqual(list(field.dist), list(fresh.dist))
+        w = grid.width
+        for i, d in enumerate(field.dist):
+            at = (i % w, i // w)
+            step = field.next_step(at)
+            if d == inf or at == field.goal:
+                self.assertIsNone(step)
+                continue
+            # every move lands on a location exactly its weight cheaper.
+            self.assertFalse(grid.cells[step[1]*w + step[0]])
+            self.assertEqual(d, field.distance(step) + grid.weight(step))
+
+    def run_edits(self, weights, trials=40, edits=30):
+        rng = random.Random(21 + len(weights))
+        for _ in range(trials):
+            grid = random_grid(rng, False)
+            w, h = grid.width, grid.height
+            if weights != (1,):
+                for i in range(w*h): grid.set_weight((i % w, i // w), rng.choice(weights))
+            goal = (rng.randrange(w), rng.randrange(h))
+            field = FlowField(grid, goal)
+            self.check(field, grid)
+            for _ in range(edits):
+                p = (rng.randrange(w), rng.randrange(h))
+                roll = rng.random()
+                if roll < 0.35: grid.add_wall(p)
+                elif roll < 0.7: grid.remove_wall(p)
+                else: grid.set_weight(p, rng.choice(weights))
+                self.check(field, grid)
+            field.close()
+
+    def test_uniform(self):
+        self.run_edits((1,))
+
+    def test_whole_weights(self):
+        # the bucket queue, with weights of 0 among them
+        self.run_edits((0, 1, 2, 5))
+
+    def test_fractional_weights(self):
+        self.run_edits((0.5, 1, 2.25))
+
+    def test_paths(self):
+        rng = random.Random(21)
+        for _ in range(100):
+            grid = random_grid(rng, rng.random() < 0.5)
+            w, h = grid.width, grid.height
+            start = (rng.randrange(w), rng.randrange(h))
+            goal = (rng.randrange(w), rng.randrange(h))
+            result = FlowField(grid, goal, listen=False).path(start)
+            self.assertEqual(result.cost, a_star_search(grid, start, goal).cost)
+            if result.path is not None:
+                self.assertEqual((result.path[0], result.path[-1]), (start, goal))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+    Regression tests for the binary maze format: saving a grid and loading it
+    back must give the same cells, weights and header, packed or not.
+
+        python -m unittest test_maze_file
+"""
+import os
+import random
+import tempfile
+import unittest
+import maze_file
+from maze_generator import maze_generator
+from weighted_grid import WeightedGrid
+
+
+class TestRoundTrip(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.folder.name, 'maze.amz')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_save_grid(self):
+        rng = random.Random(8)
+        for trial in range(60):
+            # widths around multiples of 8 exercise the padding of packed rows
+            w, h = rng.randint(1, 26), rng.randint(1, 9)
+            grid = WeightedGrid(w, h)
+            for i in range(w*h): grid.cells[i] = rng.random() < 0.4
+            if trial % 3 == 0:
+                for i in range(w*h): grid.set_weight((i % w, i // w), rng.choice((0.5, 1, 3)))
+            start = (rng.randrange(w), rng.randrange(h)) if trial % 2 else None
+            goal = (rng.randrange(w), rng.randrange(h)) if trial % 2 else None
+            seed = rng.randrange(2**63) if trial % 4 else None
+            packed = trial % 5 < 2
+            maze_file.save_grid(self.filename, grid, start, goal, seed, packed)
+
+            header = maze_file.read_header(self.filename)
+            self.assertEqual((header.width, header.height, header.start, header.goal, header.seed),
+                             (w, h, start, goal, seed))
+            self.assertEqual((header.weights, header.packed), (grid.weights is not None, packed))
+            self.assertEqual(os.path.getsize(self.filename), header.cells_offset + header.stride*h)
+
+            loaded, header = maze_file.load_maze(self.filename)
+            self.assertEqual((loaded.width, loaded.height), (w, h))
+            self.assertEqual(bytes(loaded.cells), bytes(grid.cells))
+            if grid.weights is None: self.assertIsNone(loaded.weights)
+            else: self.assertEqual(list(loaded.weights), list(grid.weights))
+            del loaded
+
+    def test_write_maze(self):
+        mg = maze_generator(21, 11, fast=True, seed=8)
+        for packed in (False, True):
+            mg.write_binary(self.filename, packed)
+            grid, header = maze_file.load_maze(self.filename)
+            self.assertEqual((header.start, header.goal, header.seed), (mg.start, mg.goal, mg.seed))
+            self.assertEqual(bytes(grid.cells), bytes(WeightedGrid.from_maze(mg.display()).cells))
+            del grid
+
+    def test_text_maze(self):
+        with open(self.filename, 'w') as f: f.write('# #\n   \n## \n')
+        grid, header = maze_file.load_maze(self.filename)
+        self.assertEqual(bytes(grid.cells), b'\x01\x00\x01\x00\x00\x00\x01\x01\x00')
+        self.assertIsNone(header.start)
+
+    def test_truncated(self):
+        maze_file.save_grid(self.filename, WeightedGrid(9, 4), packed=True)
+        with open(self.filename, 'r+b') as f: f.truncate(os.path.getsize(self.filename) - 1)
+        with self.assertRaises(ValueError):
+            maze_file.load_maze(self.filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
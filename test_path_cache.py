@@ -0,0 +1,70 @@
+"""
+    Regression tests for PathCache: answers must match a fresh
+    a_star_search() on the grid as it is after every edit, and the cache must
+    stay within its byte bound.
+
+        python -m unittest test_path_cache
+"""
+import os
+import random
+import tempfile
+import unittest
+from astar_solver import a_star_search
+from path_cache import PathCache
+from test_astar_solver import random_grid
+from weighted_grid import WeightedGrid
+
+
+class TestEdits(unittest.TestCase):
+
+    def test_random_edits(self):
+        rng = random.Random(16)
+        for _ in range(40):
+            grid = random_grid(rng, rng.random() < 0.5)
+            w, h = grid.width, grid.height
+            cache = PathCache(max_bytes=2000)
+            queries = [((rng.randrange(w), rng.randrange(h)), (rng.randrange(w), rng.randrange(h)))
+                       for _ in range(6)]
+            for _ in range(30):
+                p = (rng.randrange(w), rng.randrange(h))
+                roll = rng.random()
+                if roll < 0.2: grid.add_wall(p)
+                elif roll < 0.4: grid.remove_wall(p)
+                elif roll < 0.5: grid.set_weight(p, rng.choice((1, 2, 5)))
+                start, goal = rng.choice(queries)
+                fresh = a_star_search(grid, start, goal)
+                result = cache.solve(grid, start, goal)
+                self.assertEqual(result.cost, fresh.cost)
+                self.assertEqual(result.path, fresh.path)
+                self.assertLessEqual(cache.size, cache.max_bytes)
+                self.assertEqual(cache.size, sum(e[2] for e in cache._entries.values()))
+
+    def test_same_content(self):
+        # a second grid with the same walls hits the entries of the first.
+        rows = ['#   #', '  # #', '     ']
+        cache = PathCache()
+        cache.solve(WeightedGrid.from_maze(rows), (1, 0), (4, 2))
+        result = cache.solve(WeightedGrid.from_maze(rows), (1, 0), (4, 2))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(result.cost, 5)
+        self.assertEqual(result.expanded, 0)
+
+
+class TestDatabase(unittest.TestCase):
+
+    def test_reopen(self):
+        rows = ['     ', ' ### ', '     ']
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, 'paths.sqlite')
+            cache = PathCache(filename=filename)
+            first = cache.solve(WeightedGrid.from_maze(rows), (0, 0), (4, 2))
+            cache.close()
+            cache = PathCache(filename=filename)
+            again = cache.solve(WeightedGrid.from_maze(rows), (0, 0), (4, 2))
+            cache.close()
+        self.assertEqual(cache.disk_hits, 1)
+        self.assertEqual((again.cost, again.path), (first.cost, first.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,347 @@
+"""
+    WeightedGrid, the graph searched by the A* solver.
+
+    The grid is stored as flat, row major arrays (index = y*width + x) so wall
+    and weight lookups are constant time and a grid costs one byte per
+    location rather than a tuple per wall.
+
+    Grids can be edited in place with add_wall(), remove_wall() and
+    set_weight().  Every edit bumps the grid's version, and functions
+    registered with add_listener() are called with the indexes that changed,
+    so anything built from a grid (landmarks, indexes, incremental planners)
+    can tell it is out of date or repair itself.
+
+    Searches don't test bounds and walls for each neighbor.  Every location
+    has a mask byte (see neighbor_masks()) with one bit per possible move,
+    and MOVE_TABLE maps the mask to the moves themselves, in the order
+    neighbors() tries them, so expanding a location is one table lookup.
+"""
+from array import array
+
+# translation table used to turn a row of maze text into obstruction flags.
+# '#' becomes 1 (obstruction), every other character becomes 0 (open floor).
+_WALL_TABLE = bytes(1 if c == ord('#') else 0 for c in range(256))
+
+
+def wall_flags(row):
+    """
+        pre: row is one row of maze text, as str or bytes
+        post: returns the row as bytes of obstruction flags, 1 for '#' and 0
+              for anything else.
+    """
+    if isinstance(row, str): row = row.encode('latin-1')
+    return bytes(row).translate(_WALL_TABLE)
+
+
+# the moves in E W N S order.  A move's code is its index here.
+MOVES = ((1, 0), (-1, 0), (0, -1), (0, 1))
+
+# bit 4 of a mask byte holds the parity of x + y, so the tie-break of
+# neighbors() is part of the lookup.
+PARITY_BIT = 16
+
+# MOVE_TABLE[mask] is a tuple of the (dx, dy, code) moves allowed by mask:
+# E W N S on odd locations and S N W E on even ones, see neighbors().
+MOVE_TABLE = tuple(
+    tuple((dx, dy, d) for d, (dx, dy) in (reversed(list(enumerate(MOVES)))
+                                          if not mask & PARITY_BIT else enumerate(MOVES))
+          if mask & (1 << d))
+    for mask in range(32))
+
+# cells byte -> 1 for open floor, 0 for an obstruction.
+_OPEN_TABLE = bytes([1]) + bytes(255)
+
+
+def neighbor_masks(cells, width, height):
+    """
+        pre: cells holds width*height obstruction flags as in WeightedGrid
+        post: returns a bytearray with a mask byte per location.  Bit d is set
+              when move d of MOVES stays on the grid and lands on open floor,
+              and PARITY_BIT is set when x + y is odd.  The masks are built
+              with whole grid integer shifts, not per location.
+    """
+    n = width*height
+    if n == 0: return bytearray()
+    # every byte of the integers below is 0 or 1, so shifting by a multiple
+    # of 8 bits moves whole locations and shifting by 1 to 4 bits moves a
+    # flag to its bit without touching the next byte.
+    opened = int.from_bytes(bytes(cells).translate(_OPEN_TABLE), 'little')
+    not_last = int.from_bytes((bytes([1])*(width - 1) + bytes(1))*height, 'little')
+    not_first = int.from_bytes((bytes(1) + bytes([1])*(width - 1))*height, 'little')
+    even_row = (bytes([0, 1])*((width + 1)//2))[:width]
+    odd_row = (bytes([1, 0])*((width + 1)//2))[:width]
+    parity = int.from_bytes((even_row + odd_row)*(height//2) + even_row*(height % 2), 'little')
+    masks = (((opened >> 8) & not_last)
+             | (((opened << 8) & not_first) << 1)
+             | ((opened << 8*width) << 2)
+             | ((opened >> 8*width) << 3)
+             | (parity << 4))
+    return bytearray((masks & ((1 << 8*n) - 1)).to_bytes(n, 'little'))
+
+
+class WeightedGrid:   
+    def __init__(self, width, height, cells=None, weights=None):
+        """
+            creates a WeightedGrid object
+            
+            pre: int width and height are passed in.  cells and weights can be
+                 passed in to use existing buffers (for example memoryviews of
+                 a memory mapped maze file) without copying them, they must
+                 hold width*height items in the layout described below.
+            post: an empty grid is created.  cells is a bytearray with one byte
+                  per location (row major, index = y*width + x), 1 marks an
+                  obstruction and 0 marks open floor.  weights stays None until
+                  the first call to set_weight(), then becomes a dense array of
+                  per location weights.  version counts the edits made.
+        """
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width*height) if cells is None else cells
+        self.weights = weights
+        self.version = 0
+        self._listeners = []
+        self._masks = None
+        self._min_weight = None
+
+    @classmethod
+    def from_maze(cls, display, width=None, height=None):
+        """
+            pre: display is a list of rows of a maze, each row is a string (or
+                 bytes) where '#' is a wall. width and height default to the size of display.
+            post: returns a new WeightedGrid with the walls of display marked as
+                  obstructions.  Rows are translated a whole row at a time, no
+                  per location tuples are created.
+        """
+        rows = list(display)
+        if height is None: height = len(rows)
+        if width is None: width = max((len(row) for row in rows), default=0)
+        g = cls(width, height)
+        for y, row in enumerate(rows[:height]):
+            line = wall_flags(row[:width])
+            g.cells[y*width:y*width+len(line)] = line
+        return g
+
+    @classmethod
+    def from_bytes(cls, data, width, height):
+        """
+            pre: data holds width*height bytes in the layout of cells, as
+                 produced by bytes(grid.cells)
+            post: returns a new WeightedGrid using a copy of data as its cells.
+                  This is the compact form used to pass grids between
+                  processes.
+        """
+        if len(data) != width*height:
+            raise ValueError(f'expected {width*height} bytes, got {len(data)}')
+        g = cls(width, height)
+        g.cells[:] = data
+        return g
+
+    def index(self, location):
+        """
+            pre: location (x,y) on the grid is passed in
+            post: returns the position of the location in cells and weights
+        """
+        return location[1]*self.width + location[0]
+
+    def location(self, i):
+        """
+            pre: i is an index into cells
+            post: returns the (x,y) location stored at that index
+        """
+        y, x = divmod(i, self.width)
+        return (x, y)
+
+    @property
+    def masks(self):
+        """
+            post: returns the neighbor masks of the grid (see
+                  neighbor_masks()), building them the first time.  They are
+                  kept up to date by add_wall() and remove_wall(); cells
+                  written directly must be followed by _changed(None).
+        """
+        if self._masks is None:
+            self._masks = neighbor_masks(self.cells, self.width, self.height)
+        return self._masks
+
+    def _set_open(self, i, opened):
+        """
+            post: the masks of the locations next to i allow moving onto i
+                  when opened, and don't otherwise.
+        """
+        masks = self._masks
+        if masks is None: return
+        w = self.width
+        x = i % w
+        # each neighbor moves onto i with the opposite of the move to it.
+        for to, ok, bit in ((i + 1, x + 1 < w, 2), (i - 1, x > 0, 1),
+                            (i - w, i >= w, 8), (i + w, i + w < len(masks), 4)):
+            if not ok: continue
+            if opened: masks[to] |= bit
+            else: masks[to] &= ~bit
+
+    @property
+    def obstructions(self):
+        """
+            post: returns a list of (x,y) locations that are obstructions.
+                  Kept for compatibility with walls_from_maze() style code,
+                  lookups should go through traversable() instead.
+        """
+        w = self.width
+        return [(i % w, i // w) for i, c in enumerate(self.cells) if c]
+
+    @obstructions.setter
+    def obstructions(self, walls):
+        """
+            pre: walls is an iterable of (x,y) locations, like the list returned
+                 by AStarMaze.walls_from_maze()
+            post: cells is cleared and every on-grid location in walls is marked
+                  as an obstruction.
+        """
+        self.cells = bytearray(self.width*self.height)
+        for p in walls:
+            if self.on_grid(p): self.cells[p[1]*self.width + p[0]] = 1
+        self._changed(None)
+
+    def add_listener(self, listener):
+        """
+            pre: listener is a function called as listener(grid, changed) after
+                 every edit, changed being a list of the indexes edited, or
+                 None when the whole grid was replaced.
+            post: listener is called on every later edit
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+            post: listener is no longer called on edits
+        """
+        self._listeners.remove(listener)
+
+    def _changed(self, changed):
+        """
+            post: version is bumped and the listeners are told about changed.
+                  When the whole grid changed the masks are rebuilt on their
+                  next use.
+        """
+        if changed is None: self._masks = self._min_weight = None
+        self.version += 1
+        for listener in list(self._listeners):
+            listener(self, changed)
+
+    def add_wall(self, location):
+        """
+            pre: location (x,y) on the grid is passed in
+            post: the location is an obstruction
+        """
+        i = location[1]*self.width + location[0]
+        if not self.cells[i]:
+            self.cells[i] = 1
+            self._set_open(i, False)
+            self._changed([i])
+
+    def remove_wall(self, location):
+        """
+            pre: location (x,y) on the grid is passed in
+            post: the location is open floor
+        """
+        i = location[1]*self.width + location[0]
+        if self.cells[i]:
+            self.cells[i] = 0
+            self._set_open(i, True)
+            self._changed([i])
+
+    def on_grid(self,location):
+        """
+            pre: location (x,y) is passed in
+            post: if it is within bounds of the grid, returns True, else False
+        """
+        return 0 <= location[0] < self.width and 0 <= location[1] < self.height
+
+    def traversable(self,location):
+        """
+            pre: location (x,y) on the grid is passed in
+            post: if the location is an obstruction, returns False
+                  otherwise returns True
+        """
+        return not self.cells[location[1]*self.width + location[0]]
+        
+    def neighbors(self,p):
+        """
+            pre: a location is passed in
+            post: returns a list of valid_moves.  valid_moves are
+                    1) on the grid, and
+                    2) traversable
+                  in E W N S order, or S N W E where x + y is even.
+        """
+        x,y = p[0],p[1]
+        # There is an explanation for the reversed order in the "Ugly Path"
+        # section from the article I used as a source.  It is part of the
+        # MOVE_TABLE lookup.
+        return [(x+dx, y+dy) for dx, dy, _ in MOVE_TABLE[self.masks[y*self.width + x]]]
+
+    def adjacent(self, i):
+        """
+            pre: i is an index into cells
+            post: returns a list of the indexes of the traversable locations
+                  next to i, in E W N S order.  Used by precomputations that
+                  walk the whole grid and don't need the neighbors() tie-break.
+        """
+        w, cells = self.width, self.cells
+        x = i % w
+        out = []
+        if x + 1 < w and not cells[i+1]: out.append(i+1)
+        if x > 0 and not cells[i-1]: out.append(i-1)
+        if i >= w and not cells[i-w]: out.append(i-w)
+        if i + w < len(cells) and not cells[i+w]: out.append(i+w)
+        return out
+
+    def min_weight(self):
+        """
+            post: returns the smallest cost of moving onto any location, which
+                  heuristics scale by so they never overestimate.  The
+                  scan of the weights is kept until an edit could raise the
+                  smallest weight; weights written directly must be followed
+                  by _changed(None).
+        """
+        if self.weights is None: return 1
+        if self._min_weight is None:
+            self._min_weight = max(0, min(self.weights, default=1))
+        return self._min_weight
+
+    def set_weight(self, location, weight):
+        """
+            pre: location (x,y) on the grid and a numeric weight are passed in
+            post: the weight of the location is set.  The dense weights array
+                  is created (every location weighing 1) the first time a
+                  weight is set.
+        """
+        i = location[1]*self.width + location[0]
+        if self.weights is None:
+            if weight == 1: return
+            self.weights = array('d', [1.0]) * (self.width*self.height)
+        elif self.weights[i] == weight: return
+        m = self._min_weight
+        if m is not None:
+            # lowering a weight can only lower the smallest one, raising the
+            # smallest one needs a new scan.
+            if weight < m: self._min_weight = max(0, weight)
+            elif self.weights[i] <= m: self._min_weight = None
+        self.weights[i] = weight
+        self._changed([i])
+
+    def weight(self, location):
+        """
+            pre: location (x,y) on the grid is passed in
+            post: returns the weight of the location, 1 if no weights were set
+        """
+        if self.weights is None: return 1
+        return self.weights[location[1]*self.width + location[0]]
+    
+    def cost(self, A, B):
+        """
+            pre: A is current location, B is destination location.
+            post: returns weight value of B if weights have been set,
+                    or 1 otherwise.
+        """
+        if self.weights is None: return 1
+        return self.weights[B[1]*self.width + B[0]]